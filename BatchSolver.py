@@ -0,0 +1,99 @@
+# Batch solving of puzzle files, without rendering any image.
+# Run with: python BatchSolver.py Inputs/ "puzzles/*.txt" --method mac --workers 8 --output results.jsonl
+#           find puzzles -name "*.txt" | python BatchSolver.py - --method placement
+# Writes one JSON line per puzzle: {"puzzle", "status", "solution", "steps", "time"}.
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from CSPRequirements import *
+
+
+def collectPuzzles(sources, stream=sys.stdin):
+    '''
+    Returns the puzzle file paths of the sources, in order and without duplicates. A source is:
+        - a directory: every .txt file in it,
+        - "-": file paths read from the stream (one per line),
+        - a glob pattern or a file path.
+    '''
+    paths = []
+    for source in sources:
+        if source == "-":
+            paths.extend(line.strip() for line in stream if line.strip())
+        elif os.path.isdir(source):
+            paths.extend(sorted(glob.glob(os.path.join(source, "*.txt"))))
+        elif glob.has_magic(source):
+            paths.extend(sorted(glob.glob(source, recursive=True)))
+        else:
+            paths.append(source)
+
+    return list(dict.fromkeys(paths))
+
+
+def solvePuzzleFile(job):
+    '''
+    Solves one puzzle file. job is (path, method, heuristic), so it can go through Pool.imap.
+    Returns the JSON record of the puzzle. Status is "solved", "unsolved" (no solution found) or "error" (unreadable puzzle).
+    '''
+    path, method, heuristic = job
+    record = {"puzzle": path, "status": "error", "solution": None, "steps": None, "time": None}
+
+    start = time.perf_counter()
+    try:
+        bsp = BattleShipProblem("Batch", path)
+        solution = bsp.solve(method, heuristic)
+    except Exception as error:                                  # Bad file: report it and go on with the other puzzles
+        record["error"] = "{}: {}".format(type(error).__name__, error)
+        return record
+    record["time"] = time.perf_counter() - start                # Parsing and building the problem included
+    record["steps"] = bsp.steps
+
+    if solution:
+        record["status"] = "solved"
+        rows, cols = len(bsp.gridVarRow), len(bsp.gridVarCol)
+        record["solution"] = ["".join(line) for line in solutionGridBuilder(solution, rows, cols)]
+    else:
+        record["status"] = "unsolved"
+    return record
+
+
+def solveBatch(paths, method="mac", heuristic=None, workers=None, output=sys.stdout, chunksize=4):
+    '''
+    Solves the puzzle files across a pool of worker processes (os.cpu_count() by default) and writes one JSON line per puzzle
+    to output, in completion order. Returns the number of puzzles per status.
+    '''
+    jobs = [(path, method, heuristic) for path in paths]
+    counts = {}
+
+    with multiprocessing.Pool(processes=workers) as pool:
+        for record in pool.imap_unordered(solvePuzzleFile, jobs, chunksize=chunksize):
+            output.write(json.dumps(record) + "\n")
+            output.flush()                                      # Results are usable while the batch runs
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solves battleship puzzle files in parallel, one JSON line per puzzle")
+    parser.add_argument("sources", nargs="+", help='directories, glob patterns, puzzle files, or "-" to read file paths from stdin')
+    parser.add_argument("--method", default="mac", help="solve method (see BattleShipProblem.solve)")
+    parser.add_argument("--heuristic", default=None, help='None, "LCV", "MRV" or "MRV+LCV"')
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--chunksize", type=int, default=4, help="puzzles sent to a worker at once")
+    parser.add_argument("--output", default=None, help="JSONL file (default: stdout)")
+    args = parser.parse_args()
+
+    paths = collectPuzzles(args.sources)
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        counts = solveBatch(paths, args.method, args.heuristic, args.workers, output, args.chunksize)
+    finally:
+        if args.output:
+            output.close()
+
+    print("{} puzzles: {}".format(len(paths), ", ".join("{} {}".format(count, status) for status, count in sorted(counts.items()))), file=sys.stderr)
@@ -0,0 +1,344 @@
+# Benchmarks of the solver and of its building blocks.
+# Run with: python Benchmark.py lines          (line counters against the scanning line check)
+#           python Benchmark.py scaling        (solve time and memory of each solve method as the board grows)
+#           python Benchmark.py suite --report report.json     (every method/heuristic over a generated corpus)
+#           python Benchmark.py compare old.json new.json      (regressions between two suite reports)
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from CSPRequirements import *
+from PuzzleGenerator import randomPuzzle
+
+
+def makeLineBoard(size, counters):
+    '''
+    Builds a size*size board of unassigned variables and its row and column constraints.
+    With counters=True, the lines use a LineCounter (isLineCountRespected), otherwise the scanning isLineRespected.
+    Returns the variables (row-major) and, for each variable, its row and column constraints.
+    '''
+    domain = ['.', 'M', '<', '>', '^', 'v', 'S']
+    gridVarRow = [[Variable("Cell_{}_{}".format(r, c), domain, '0') for c in range(size)] for r in range(size)]
+    gridVarCol = [[gridVarRow[r][c] for r in range(size)] for c in range(size)]
+    target = size // 3                                          # Any target works, the checks cost the same
+
+    lineConstraints = {}
+    for label, grid in (("ROW", gridVarRow), ("COL", gridVarCol)):
+        for i, line in enumerate(grid):
+            if counters:
+                counter = LineCounter(target, line)
+                for var in line:
+                    var.observers.append(counter)
+                cons = Constraint("{}_{}".format(label, i), [counter] + line, isLineCountRespected)
+            else:
+                cons = Constraint("{}_{}".format(label, i), [target] + line, isLineRespected)
+            for var in line:
+                lineConstraints.setdefault(var, []).append(cons)
+
+    variables = [var for row in gridVarRow for var in row]
+    return variables, lineConstraints
+
+
+def runLineWorkload(variables, lineConstraints, moves):
+    '''
+    Replays the search pattern of is_consistent: assign a cell, check its row and column,
+    keep the value or reset the cell. Returns the elapsed time in seconds.
+    '''
+    start = time.perf_counter()
+    for index, value in moves:
+        var = variables[index]
+        if var.code != UNASSIGNED:                              # Already assigned: backtrack it
+            var.setState('0')
+            continue
+        var.setState(value)
+        if not all(cons.check() for cons in lineConstraints[var]):
+            var.setState('0')
+    return time.perf_counter() - start
+
+
+def benchmarkLineCounters(sizes=(6, 10, 15), moves=200000, seed=0):
+    '''
+    Compares the scanning isLineRespected with the LineCounter based isLineCountRespected
+    on the same random sequence of assignments, for each board size.
+    '''
+    domain = ['.', 'M', '<', '>', '^', 'v', 'S']
+    print("{:>7} | {:>12} | {:>12} | {:>7}".format("Board", "Scanning (s)", "Counters (s)", "Speedup"))
+    for size in sizes:
+        rng = random.Random(seed)
+        workload = [(rng.randrange(size * size), rng.choice(domain)) for _ in range(moves)]
+
+        scanning = runLineWorkload(*makeLineBoard(size, counters=False), workload)
+        counting = runLineWorkload(*makeLineBoard(size, counters=True), workload)
+        print("{:>7} | {:>12.3f} | {:>12.3f} | {:>6.1f}x".format("{0}x{0}".format(size), scanning, counting, scanning / counting))
+
+
+SOLVE_METHODS = ["backtracking", "backtracking_iterative", "backtracking_forwardchecking", "backtracking_forwardchecking_iterative",
+                 "mac", "bitboard", "placement", "patterns", "min_conflicts", "sat"]
+SEEDED_METHODS = ["min_conflicts"]                      # Randomized methods: solved with a fixed seed, so their steps are reproducible
+UNCHECKED_METHODS = ["bitboard", "placement", "patterns", "min_conflicts", "sat"]   # Never call Constraint.check: no checks to count
+
+
+def solveInChild(results, method, heuristic, puzzle, measureMemory, seed=0):
+    '''
+    Solves the puzzle in a child process and puts its measures in the results queue, in two parts:
+    the timed run first (status, time, steps, revisions), then a second run, instrumented to count the constraint checks
+    (see SolverStats) and traced for the peak memory when measureMemory: both slow the solver down too much to time it.
+    Seeded methods use seed, so both runs do the same search. The checks of UNCHECKED_METHODS are None, not 0.
+    '''
+    options = {"seed": seed} if method in SEEDED_METHODS else {}
+    problem = BattleShipProblem("Benchmark", puzzle=puzzle)
+    start = time.perf_counter()
+    solution = problem.solve(method, heuristic, **options)
+    elapsed = time.perf_counter() - start
+    results.put({"status": "solved" if solution else "unsolved", "time": elapsed, "steps": problem.steps, "revisions": problem.revisions})
+
+    problem = BattleShipProblem("Benchmark", puzzle=puzzle)
+    stats = problem.instrument()
+    peak = None
+    if measureMemory:
+        tracemalloc.start()
+    problem.solve(method, heuristic, **options)
+    if measureMemory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    results.put({"checks": None if method in UNCHECKED_METHODS else stats.checks(), "peak": peak})
+
+
+def timedSolve(method, heuristic, puzzle, timeout, measureMemory=True, seed=0):
+    '''
+    Solves a puzzle in a separate process, killed after timeout seconds. Returns the measures (status "timeout" if killed).
+    The counting and memory run has its own timeout: if it's too slow, only its measures (checks, peak) are None.
+    '''
+    results = multiprocessing.Queue()
+    child = multiprocessing.Process(target=solveInChild, args=(results, method, heuristic, puzzle, measureMemory, seed))
+    child.start()
+    try:
+        try:
+            result = results.get(timeout=timeout)
+        except queue.Empty:
+            return {"status": "timeout", "time": None, "steps": None, "checks": None, "revisions": None, "peak": None}
+        try:
+            result.update(results.get(timeout=timeout))
+        except queue.Empty:
+            result.update({"checks": None, "peak": None})
+        return result
+    finally:
+        child.terminate()
+        child.join()
+
+
+def medianOf(runs, field):
+    '''Median of field over the runs where it was measured (not None), or None if it never was.'''
+    values = [run[field] for run in runs if run[field] is not None]
+    return statistics.median(values) if values else None
+
+
+def benchmarkScaling(sizes=(6, 8, 10, 12, 15), methods=SOLVE_METHODS, heuristic=None, puzzles=3, hints=0.2, timeout=20.0, seed=0):
+    '''
+    Reports how the solve time, steps and peak memory of each method grow with the board size.
+    Each size is measured on the same random puzzles for every method (random fleet placement, a share "hints" of the cells revealed).
+    A method is no longer run on bigger boards once it timed out.
+    '''
+    print("{:>7} | {:>40} | {:>10} | {:>10} | {:>10} | {:>7}".format("Board", "Method", "Time (s)", "Steps", "Peak (KB)", "Solved"))
+    tooSlow = set()
+    for size in sizes:
+        instances = [randomPuzzle(size, hints=hints, seed=seed * 1000 + size * 10 + i)[0] for i in range(puzzles)]
+        for method in methods:
+            if method in tooSlow:
+                continue
+            runs = [timedSolve(method, heuristic, puzzle, timeout, seed=seed) for puzzle in instances]
+            finished = [run for run in runs if run["status"] != "timeout"]
+            if len(finished) < len(runs):
+                tooSlow.add(method)
+            if not finished:
+                print("{:>7} | {:>40} | {:>10} | {:>10} | {:>10} | {:>7}".format("{0}x{0}".format(size), method, "timeout", "-", "-", "-"))
+                continue
+            peak = medianOf(finished, "peak")               # None if every memory run timed out
+            print("{:>7} | {:>40} | {:>10.3f} | {:>10} | {:>10} | {:>7}".format(
+                "{0}x{0}".format(size), method,
+                medianOf(finished, "time"),
+                int(medianOf(finished, "steps")),
+                "-" if peak is None else int(peak // 1024),
+                "{}/{}".format(sum(run["status"] == "solved" for run in runs), len(runs))))
+
+
+# ----- Suite: every method/heuristic over a corpus, with a JSON report -----
+
+HEURISTICS = [None, "LCV", "MRV", "MRV+LCV"]
+NO_HEURISTIC = ["bitboard", "placement", "patterns", "min_conflicts", "sat"]      # Methods ignoring the heuristic: run once
+DIFFICULTIES = {"easy": 0.4, "medium": 0.2, "hard": 0.05}      # Share of the cells revealed
+
+
+def buildCorpus(sizes=(6, 8, 10), difficulties=("easy", "medium", "hard"), perGroup=3, seed=0):
+    '''
+    Generated corpus: perGroup random puzzles for each board size and difficulty (share of hints, see DIFFICULTIES).
+    The seeds only depend on the arguments, so the same arguments give the same corpus on every machine and commit.
+    '''
+    corpus = []
+    for difficulty in difficulties:
+        for size in sizes:
+            for i in range(perGroup):
+                puzzleSeed = seed * 100000 + size * 1000 + list(DIFFICULTIES).index(difficulty) * 100 + i
+                puzzle = randomPuzzle(size, hints=DIFFICULTIES[difficulty], seed=puzzleSeed)[0]
+                corpus.append({"id": "{}x{}-{}-{}".format(size, size, difficulty, i), "size": size,
+                               "difficulty": difficulty, "seed": puzzleSeed, "puzzle": puzzle})
+    return corpus
+
+
+def combinations(methods=SOLVE_METHODS, heuristics=HEURISTICS):
+    '''Every (method, heuristic) pair to run, once for the methods ignoring the heuristic.'''
+    return [(method, heuristic) for method in methods
+            for heuristic in ([None] if method in NO_HEURISTIC else heuristics)]
+
+
+def gitCommit():
+    '''Current commit of the repository, or None outside of git.'''
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return None
+
+
+def comboName(method, heuristic):
+    return method if heuristic is None else "{}:{}".format(method, heuristic)
+
+
+def runSuite(sizes=(6, 8, 10), difficulties=("easy", "medium", "hard"), perGroup=3, methods=SOLVE_METHODS, heuristics=HEURISTICS,
+             timeout=10.0, measureMemory=True, seed=0, log=sys.stderr):
+    '''
+    Runs every method/heuristic combination over the corpus, each solve in its own process with a timeout.
+    The randomized methods (SEEDED_METHODS) are solved with seed too, so two runs of the suite compare exactly.
+    A combination that timed out is skipped on bigger boards of the same difficulty (status "skipped").
+    Returns the report: metadata, one entry per run, and a summary per combination, size and difficulty.
+    '''
+    corpus = buildCorpus(sizes, difficulties, perGroup, seed)
+    combos = combinations(methods, heuristics)
+    runs = []
+    tooSlow = set()                                     # (combination, difficulty) that timed out
+
+    for entry in corpus:
+        for method, heuristic in combos:
+            name = comboName(method, heuristic)
+            if (name, entry["difficulty"]) in tooSlow:
+                result = {"status": "skipped", "time": None, "steps": None, "checks": None, "revisions": None, "peak": None}
+            else:
+                result = timedSolve(method, heuristic, entry["puzzle"], timeout, measureMemory, seed)
+                if result["status"] == "timeout":
+                    tooSlow.add((name, entry["difficulty"]))
+            runs.append(dict(puzzle=entry["id"], size=entry["size"], difficulty=entry["difficulty"],
+                             method=method, heuristic=heuristic, **result))
+            print("{:>16} {:>40} {:>8} {}".format(entry["id"], name, result["status"],
+                  "" if result["time"] is None else "{:.3f}s".format(result["time"])), file=log)
+
+    return {
+        "meta": {"commit": gitCommit(), "date": datetime.datetime.now().isoformat(timespec="seconds"),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "config": {"sizes": list(sizes), "difficulties": list(difficulties), "perGroup": perGroup, "seed": seed,
+                            "timeout": timeout, "methods": list(methods), "heuristics": list(heuristics)}},
+        "runs": runs,
+        "summary": summarize(runs),
+    }
+
+
+def summarize(runs):
+    '''
+    Median time, steps, checks and peak memory of the finished runs, per combination, size and difficulty.
+    Each median only counts the runs where the measure was taken (see medianOf): None if there's none.
+    '''
+    groups = {}
+    for run in runs:
+        key = "{} {}x{} {}".format(comboName(run["method"], run["heuristic"]), run["size"], run["size"], run["difficulty"])
+        groups.setdefault(key, []).append(run)
+
+    summary = {}
+    for key, group in groups.items():
+        finished = [run for run in group if run["status"] in ["solved", "unsolved"]]
+        summary[key] = {"runs": len(group), "solved": sum(run["status"] == "solved" for run in group),
+                        "timeouts": sum(run["status"] in ["timeout", "skipped"] for run in group),
+                        "time": medianOf(finished, "time"), "steps": medianOf(finished, "steps"),
+                        "checks": medianOf(finished, "checks"), "peak": medianOf(finished, "peak")}
+    return summary
+
+
+def compareReports(old, new, threshold=1.25, log=sys.stdout):
+    '''
+    Compares the summaries of two suite reports (same configuration) and prints every group whose time or peak memory
+    grew by more than threshold times, whose steps or checks changed (the searches are deterministic, so any change
+    is a behaviour change), or that solved fewer puzzles. Returns the number of regressions.
+    '''
+    regressions = 0
+    print("{} -> {}".format(old["meta"].get("commit"), new["meta"].get("commit")), file=log)
+    for key in sorted(set(old["summary"]) | set(new["summary"])):
+        before, after = old["summary"].get(key), new["summary"].get(key)
+        if before is None or after is None:
+            print("{:>52} | only in the {} report".format(key, "new" if before is None else "old"), file=log)
+            continue
+
+        notes = []
+        if after["solved"] < before["solved"] or after["timeouts"] > before["timeouts"]:
+            notes.append("solved {} -> {}, timeouts {} -> {}".format(before["solved"], after["solved"], before["timeouts"], after["timeouts"]))
+        for field in ["time", "peak"]:
+            if before[field] and after[field] and after[field] > threshold * before[field]:
+                notes.append("{} x{:.2f}".format(field, after[field] / before[field]))
+        for field in ["steps", "checks"]:
+            if before[field] is not None and after[field] is not None and after[field] != before[field]:
+                notes.append("{} {:g} -> {:g}".format(field, before[field], after[field]))
+
+        if notes:
+            regressions += 1
+            print("{:>52} | {}".format(key, "; ".join(notes)), file=log)
+
+    print("{} group(s) changed".format(regressions), file=log)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Battleship solver benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark")
+    subparsers.add_parser("lines", help="line counters against the scanning line check")
+    scaling = subparsers.add_parser("scaling", help="solve time and memory of each solve method as the board grows")
+    scaling.add_argument("--sizes", type=int, nargs="+", default=[6, 8, 10, 12, 15])
+    scaling.add_argument("--methods", nargs="+", default=SOLVE_METHODS)
+    scaling.add_argument("--heuristic", default=None)
+    scaling.add_argument("--puzzles", type=int, default=3, help="puzzles per size")
+    scaling.add_argument("--hints", type=float, default=0.2, help="share of the cells revealed")
+    scaling.add_argument("--timeout", type=float, default=20.0, help="seconds per solve")
+    suite = subparsers.add_parser("suite", help="every method/heuristic over a generated corpus, with a JSON report")
+    suite.add_argument("--sizes", type=int, nargs="+", default=[6, 8, 10])
+    suite.add_argument("--difficulties", nargs="+", default=list(DIFFICULTIES), choices=list(DIFFICULTIES))
+    suite.add_argument("--puzzles", type=int, default=3, help="puzzles per size and difficulty")
+    suite.add_argument("--methods", nargs="+", default=SOLVE_METHODS)
+    suite.add_argument("--heuristics", nargs="+", default=["None", "LCV", "MRV", "MRV+LCV"])
+    suite.add_argument("--timeout", type=float, default=10.0, help="seconds per solve")
+    suite.add_argument("--no-memory", action="store_true", help="skip the traced run measuring the peak memory")
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--report", default="benchmark.json", help="JSON report path")
+    compare = subparsers.add_parser("compare", help="regressions between two suite reports")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=1.25, help="time/memory ratio counted as a regression")
+    args = parser.parse_args()
+
+    if args.benchmark == "scaling":
+        benchmarkScaling(args.sizes, args.methods, args.heuristic, args.puzzles, args.hints, args.timeout)
+    elif args.benchmark == "suite":
+        heuristics = [None if heuristic == "None" else heuristic for heuristic in args.heuristics]
+        report = runSuite(args.sizes, args.difficulties, args.puzzles, args.methods, heuristics, args.timeout, not args.no_memory, args.seed)
+        with open(args.report, 'w') as file:
+            json.dump(report, file, indent=1)
+    elif args.benchmark == "compare":
+        with open(args.old) as oldFile, open(args.new) as newFile:
+            sys.exit(1 if compareReports(json.load(oldFile), json.load(newFile), args.threshold) else 0)
+    else:
+        benchmarkLineCounters()
@@ -0,0 +1,207 @@
+from typing import List
+
+from CellStates import UNASSIGNED, WATER, MIDDLE, LEFT, RIGHT, TOP, BOTTOM, SUBMARINE, SYMBOLS, CODES
+
+
+class BitBoard:
+    '''
+    Battleship board stored as integer bitmasks: one mask per state code (see CellStates.py) plus a mask of unknown cells.\n
+    Cell (row, col) is bit row * stride + col, with stride = cols + 1. The extra column of each row is always empty,
+    so that shifting a mask by one never wraps a row onto the next one.\n
+    Row and column counts are popcounts, the shape rules and the no-touch rule are shift-and-mask operations.
+    '''
+
+    def __init__(self, grid: List[List[str]], rowTargets: List[int], colTargets: List[int], ships: List[int]):
+        self.rows, self.cols = len(grid), len(grid[0])
+        self.stride = self.cols + 1
+        self.rowTargets = list(rowTargets)
+        self.colTargets = list(colTargets)
+        self.ships = list(ships)                # Number of ships of length 1, 2, 3...
+        self.steps = 0
+
+        stride = self.stride
+        self.full = 0                           # Every cell of the board
+        self.rowMasks = [0] * self.rows
+        self.colMasks = [0] * self.cols
+        for r in range(self.rows):
+            for c in range(self.cols):
+                bit = 1 << (r * stride + c)
+                self.full |= bit
+                self.rowMasks[r] |= bit
+                self.colMasks[c] |= bit
+
+        # Cells on each border: out of the board counts as water
+        self.leftEdge = self.colMasks[0]
+        self.rightEdge = self.colMasks[-1]
+        self.topEdge = self.rowMasks[0]
+        self.bottomEdge = self.rowMasks[-1]
+
+        # 3x3 neighbourhood of every cell: the only cells whose shape rules can change when the cell is assigned
+        self.around = {}
+        for r in range(self.rows):
+            for c in range(self.cols):
+                mask = 0
+                for y in range(max(r - 1, 0), min(r + 2, self.rows)):
+                    for x in range(max(c - 1, 0), min(c + 2, self.cols)):
+                        mask |= 1 << (y * stride + x)
+                self.around[r * stride + c] = mask
+
+        self.masks = [0] * len(SYMBOLS)         # One mask per code, masks[UNASSIGNED] stays empty
+        self.unknown = 0
+        for r, line in enumerate(grid):
+            for c, symbol in enumerate(line):
+                bit = 1 << (r * stride + c)
+                if CODES.get(symbol, UNASSIGNED) != UNASSIGNED:
+                    self.masks[CODES[symbol]] |= bit
+                else:                           # '0' (or None): no hint
+                    self.unknown |= bit
+
+
+    def shipMask(self):
+        '''Mask of all ship segments.'''
+        masks = self.masks
+        return masks[MIDDLE] | masks[LEFT] | masks[RIGHT] | masks[TOP] | masks[BOTTOM] | masks[SUBMARINE]
+
+
+    def violations(self):
+        '''
+        Returns the mask of the cells breaking a shape rule or the no-touch rule.
+        Unknown cells can still become anything, so they never cause a violation.
+        '''
+        full, stride = self.full, self.stride
+        masks, unknown = self.masks, self.unknown
+        ship = self.shipMask()
+
+        # Cells whose right/left/upper/lower neighbour is in a mask
+        right = lambda mask: (mask >> 1) & full
+        left = lambda mask: (mask << 1) & full
+        up = lambda mask: (mask << stride) & full
+        down = lambda mask: (mask >> stride) & full
+
+        canWater = masks[WATER] | unknown
+        waterRight = right(canWater) | self.rightEdge
+        waterLeft = left(canWater) | self.leftEdge
+        waterUp = up(canWater) | self.topEdge
+        waterDown = down(canWater) | self.bottomEdge
+        waterSides = waterLeft & waterRight
+        waterEnds = waterUp & waterDown
+
+        horizontalBody = right(masks[MIDDLE] | masks[RIGHT] | unknown) & left(masks[MIDDLE] | masks[LEFT] | unknown)
+        verticalBody = down(masks[MIDDLE] | masks[BOTTOM] | unknown) & up(masks[MIDDLE] | masks[TOP] | unknown)
+
+        bad = masks[LEFT] & ~(waterLeft & waterEnds & right(masks[MIDDLE] | masks[RIGHT] | unknown))
+        bad |= masks[RIGHT] & ~(waterRight & waterEnds & left(masks[MIDDLE] | masks[LEFT] | unknown))
+        bad |= masks[TOP] & ~(waterUp & waterSides & down(masks[MIDDLE] | masks[BOTTOM] | unknown))
+        bad |= masks[BOTTOM] & ~(waterDown & waterSides & up(masks[MIDDLE] | masks[TOP] | unknown))
+        bad |= masks[SUBMARINE] & ~(waterSides & waterEnds)
+        bad |= masks[MIDDLE] & ~((horizontalBody & waterEnds) | (verticalBody & waterSides))
+
+        # No-touch: no ship segment on a diagonal of another one
+        diagonals = ((ship << (stride + 1)) | (ship << (stride - 1)) | (ship >> (stride - 1)) | (ship >> (stride + 1))) & full
+        bad |= ship & diagonals
+
+        return bad
+
+
+    def lineRespected(self, mask, target):
+        '''Same rule as isLineRespected, on the cells of a row or column mask.'''
+        count = (self.shipMask() & mask).bit_count()
+        return count <= target and count + (self.unknown & mask).bit_count() >= target
+
+
+    def isConsistent(self, index):
+        '''Checks the rules affected by the assignment of cell index (row, col and the 3x3 around it).'''
+        r, c = divmod(index, self.stride)
+        return (self.lineRespected(self.rowMasks[r], self.rowTargets[r])
+                and self.lineRespected(self.colMasks[c], self.colTargets[c])
+                and not self.violations() & self.around[index])
+
+
+    def shipLengths(self):
+        '''Returns the length of every ship of a complete board.'''
+        stride, masks = self.stride, self.masks
+        lengths = [1] * masks[SUBMARINE].bit_count()
+        for start, end, step in ((LEFT, RIGHT, 1), (TOP, BOTTOM, stride)):
+            starts = masks[start]
+            while starts:
+                bit = starts & -starts                  # Lowest start segment
+                starts ^= bit
+                length = 1
+                while not (bit & masks[end]):           # Follow the ship until its end segment
+                    bit = bit << step
+                    length += 1
+                lengths.append(length)
+        return lengths
+
+
+    def fleetRespected(self):
+        '''Checks the number of ships of each length on a complete board.'''
+        counts = [0] * len(self.ships)
+        for length in self.shipLengths():
+            if length > len(counts):                    # Longer than any ship of the fleet
+                return False
+            counts[length - 1] += 1
+        return counts == self.ships
+
+
+    def solve(self):
+        '''
+        Backtracking search over the unknown cells, in row-major order.
+        Returns the solution grid (list of rows of symbols) or None.
+        '''
+        if self.violations():                           # The hints themselves break a rule
+            return None
+        for r in range(self.rows):
+            if not self.lineRespected(self.rowMasks[r], self.rowTargets[r]):
+                return None
+        for c in range(self.cols):
+            if not self.lineRespected(self.colMasks[c], self.colTargets[c]):
+                return None
+
+        cells = []
+        unknown = self.unknown
+        while unknown:
+            bit = unknown & -unknown
+            unknown ^= bit
+            cells.append(bit.bit_length() - 1)
+
+        if self.search(cells, 0):
+            return self.toGrid()
+        return None
+
+
+    def search(self, cells, depth):
+        '''Recursive search: assigns cells[depth], then the following ones.'''
+        self.steps += 1
+
+        if depth == len(cells):
+            return self.fleetRespected()
+
+        index = cells[depth]
+        bit = 1 << index
+        masks = self.masks
+        self.unknown ^= bit                             # The cell is no longer unknown
+        for code in range(WATER, SUBMARINE + 1):
+            masks[code] |= bit
+            if self.isConsistent(index) and self.search(cells, depth + 1):
+                return True
+            masks[code] ^= bit
+
+        self.unknown |= bit                             # Backtrack
+        return False
+
+
+    def toGrid(self):
+        '''Returns the board as a list of rows of symbols ('0' for unknown cells).'''
+        grid = []
+        for r in range(self.rows):
+            line = []
+            for c in range(self.cols):
+                bit = 1 << (r * self.stride + c)
+                symbol = '0'
+                for code, mask in enumerate(self.masks):
+                    if mask & bit:
+                        symbol = SYMBOLS[code]
+                line.append(symbol)
+            grid.append(line)
+        return grid
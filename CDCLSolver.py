@@ -0,0 +1,275 @@
+import heapq
+from typing import List
+
+
+def luby(i):
+    '''i-th term (from 1) of the Luby sequence: 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8...'''
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class CDCLSolver:
+    '''
+    Conflict-driven clause learning SAT solver, for CNFs given as lists of DIMACS style clauses (see SatEncoding.py).\n
+        - Unit propagation with two watched literals per clause.
+        - First UIP clause learning and non-chronological backjumping.
+        - VSIDS decisions: the variables of the recent conflicts first (lazy heap, like MRVQueue), with phase saving.
+        - Restarts following the Luby sequence, and deletion of half of the learnt clauses when there are too many.
+    '''
+
+    def __init__(self, numVars: int, clauses: List[List[int]], phases=None):
+        '''phases optionally gives the literals to try first (their variable's initial saved phase), false otherwise.'''
+        self.numVars = numVars
+        self.value = [0] * (numVars + 1)            # 1 true, -1 false, 0 unassigned
+        self.level = [0] * (numVars + 1)
+        self.reason = [None] * (numVars + 1)
+        self.phase = [-1] * (numVars + 1)           # Saved polarity, false by default
+        for literal in phases or []:
+            self.phase[abs(literal)] = 1 if literal > 0 else -1
+        self.activity = [0.0] * (numVars + 1)
+        self.bump = 1.0
+        self.trail = []
+        self.trailLimits = []                       # Trail length at each decision
+        self.head = 0                               # Next trail literal to propagate
+        self.watches = [[] for _ in range(2 * numVars + 2)]
+        self.learnts = []
+        self.heap = [(0.0, v) for v in range(1, numVars + 1)]  # (-activity, variable), stale entries skipped when popped
+        self.inHeap = [True] * (numVars + 1)        # The variable has an entry with its current activity
+        heapq.heapify(self.heap)
+
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        self.restarts = 0
+
+        self.unsatisfiable = False
+        for clause in clauses:
+            self.addClause(list(dict.fromkeys(clause)))
+
+
+    def watchIndex(self, literal):
+        return 2 * literal if literal > 0 else -2 * literal + 1
+
+
+    def litValue(self, literal):
+        value = self.value[abs(literal)]
+        return value if literal > 0 else -value
+
+
+    def addClause(self, clause):
+        '''Adds an input clause (before solving): empty clauses make the CNF unsatisfiable, unit clauses are assigned at level 0.'''
+        if any(-literal in clause for literal in clause):
+            return                                  # Tautology
+        if not clause:
+            self.unsatisfiable = True
+        elif len(clause) == 1:
+            if self.litValue(clause[0]) == -1:
+                self.unsatisfiable = True
+            elif self.litValue(clause[0]) == 0:
+                self.assign(clause[0], None)
+        else:
+            self.watches[self.watchIndex(clause[0])].append(clause)
+            self.watches[self.watchIndex(clause[1])].append(clause)
+
+
+    def assign(self, literal, reason):
+        v = abs(literal)
+        self.value[v] = 1 if literal > 0 else -1
+        self.level[v] = len(self.trailLimits)
+        self.reason[v] = reason
+        self.trail.append(literal)
+
+
+    def propagate(self):
+        '''Unit propagation from the trail. Returns a conflicting clause, or None.'''
+        value = self.value
+        while self.head < len(self.trail):
+            literal = self.trail[self.head]
+            self.head += 1
+            self.propagations += 1
+            falseLiteral = -literal
+            watchers = self.watches[self.watchIndex(falseLiteral)]
+            kept = []
+            conflict = None
+            i = 0
+            while i < len(watchers):
+                clause = watchers[i]
+                i += 1
+                if clause and clause[0] == 0:       # Deleted learnt clause
+                    continue
+                if clause[0] == falseLiteral:       # The false watch goes second
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                firstValue = value[abs(first)] if first > 0 else -value[abs(first)]
+                if firstValue == 1:
+                    kept.append(clause)
+                    continue
+
+                for k in range(2, len(clause)):     # Another literal to watch
+                    other = clause[k]
+                    if (value[abs(other)] if other > 0 else -value[abs(other)]) != -1:
+                        clause[1], clause[k] = other, falseLiteral
+                        self.watches[self.watchIndex(other)].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if firstValue == -1:            # Every literal is false
+                        conflict = clause
+                        kept.extend(watchers[i:])
+                        break
+                    self.assign(first, clause)      # Unit: the first literal must be true
+            self.watches[self.watchIndex(falseLiteral)] = kept
+            if conflict is not None:
+                return conflict
+        return None
+
+
+    def analyze(self, conflict):
+        '''First UIP learning. Returns the learnt clause (asserting literal first, highest other level second) and the backjump level.'''
+        seen = set()
+        learnt = [None]
+        current = len(self.trailLimits)
+        counter = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                v = abs(other)
+                if v not in seen and self.level[v] > 0:
+                    seen.add(v)
+                    self.bumpActivity(v)
+                    if self.level[v] == current:
+                        counter += 1
+                    else:
+                        learnt.append(other)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            clause = self.reason[abs(literal)]
+            seen.discard(abs(literal))
+            counter -= 1
+            if counter == 0:
+                break
+
+        learnt[0] = -literal
+        if len(learnt) == 1:
+            return learnt, 0
+        highest = max(range(1, len(learnt)), key=lambda i: self.level[abs(learnt[i])])
+        learnt[1], learnt[highest] = learnt[highest], learnt[1]
+        return learnt, self.level[abs(learnt[1])]
+
+
+    def bumpActivity(self, v):
+        self.activity[v] += self.bump
+        if self.activity[v] > 1e100:                # Rescale every activity
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.bump *= 1e-100
+            self.heap = [(-self.activity[u], u) for u in range(1, self.numVars + 1) if not self.value[u]]
+            self.inHeap = [not self.value[u] for u in range(self.numVars + 1)]
+            heapq.heapify(self.heap)
+        elif self.inHeap[v]:                        # Its entry is stale now: add one with the new activity
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+
+    def backjump(self, level):
+        '''Undoes the assignments above level, saving their phase, and puts their variables back in the heap.'''
+        if len(self.trailLimits) <= level:
+            return
+        limit = self.trailLimits[level]
+        for literal in self.trail[limit:]:
+            v = abs(literal)
+            self.phase[v] = self.value[v]
+            self.value[v] = 0
+            self.reason[v] = None
+            if not self.inHeap[v]:
+                self.inHeap[v] = True
+                heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[limit:]
+        del self.trailLimits[level:]
+        self.head = limit
+
+
+    def decide(self):
+        '''Most active unassigned variable, with its saved phase. Returns None when every variable is assigned.'''
+        while self.heap:
+            key, v = heapq.heappop(self.heap)
+            if -key != self.activity[v]:            # Stale entry, the variable has a newer one
+                continue
+            self.inHeap[v] = False
+            if not self.value[v]:
+                self.decisions += 1
+                return v * self.phase[v]
+        return None
+
+
+    def reduceLearnts(self):
+        '''Deletes the longer half of the learnt clauses that aren't the reason of an assignment (marked with a 0 first literal).'''
+        locked = set(id(self.reason[abs(literal)]) for literal in self.trail if self.reason[abs(literal)] is not None)
+        self.learnts.sort(key=len)
+        keep = len(self.learnts) // 2
+        for clause in self.learnts[keep:]:
+            if id(clause) not in locked:
+                clause[0] = 0
+        self.learnts = [clause for clause in self.learnts if clause[0] != 0]
+
+
+    def solve(self, max_conflicts=None, restart_unit=100, max_learnts=None):
+        '''
+        Returns a model (list of booleans indexed by variable, index 0 unused), or None if the CNF is unsatisfiable
+        or max_conflicts conflicts were reached (self.unknown is then True).
+        '''
+        self.unknown = False
+        if self.unsatisfiable or self.propagate() is not None:
+            return None
+        max_learnts = max_learnts or max(1000, self.numVars // 2)
+
+        restart = 1
+        budget = restart_unit * luby(restart)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                budget -= 1
+                if not self.trailLimits:
+                    return None                     # Conflict without decision: unsatisfiable
+                learnt, level = self.analyze(conflict)
+                self.backjump(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.watches[self.watchIndex(learnt[0])].append(learnt)
+                    self.watches[self.watchIndex(learnt[1])].append(learnt)
+                    self.learnts.append(learnt)
+                    self.assign(learnt[0], learnt)
+                self.bump /= 0.95                   # Decay: the next conflicts weigh more
+                if max_conflicts is not None and self.conflicts >= max_conflicts:
+                    self.unknown = True
+                    return None
+                continue
+
+            if budget <= 0:                         # Restart
+                self.restarts += 1
+                restart += 1
+                budget = restart_unit * luby(restart)
+                self.backjump(0)
+                if len(self.learnts) > max_learnts:
+                    self.reduceLearnts()
+                continue
+
+            literal = self.decide()
+            if literal is None:
+                return [False] + [self.value[v] == 1 for v in range(1, self.numVars + 1)]
+            self.trailLimits.append(len(self.trail))
+            self.assign(literal, None)
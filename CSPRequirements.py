@@ -2,39 +2,103 @@
 #   - Constraint functions
 #   - Parsing input (to read input files)
 from ConstraintDefinition import *
+from CellStates import *
 from ParsingInput import *
 from GridSystem import *
+from BitBoard import BitBoard
+from PlacementSolver import PlacementSolver
+from MinConflicts import MinConflictsSolver
+from LinePatterns import LinePatternSolver
+from SatEncoding import CNFEncoding
+from CDCLSolver import CDCLSolver
+from Instrumentation import SolverStats
+from Nogoods import ZobristBand, NogoodTable
+from collections import deque
+import heapq
+import multiprocessing
 
 class Variable:
-    '''Class used to define variables.'''
+    '''
+    Class used to define variables: the cells of the grid.\n
+    Compact, as thousands of boards can be in memory: no instance dictionary (__slots__), the coordinates are integers
+    read once from the name ("Cell_ROW_COL"), the state is an integer code and the domain a bitmask of codes (see CellStates.py).
+    name, state and domain are still available as strings and lists of symbols, computed when read.
+    '''
+    __slots__ = ("label", "row", "col", "code", "mask", "observers")
+
     def __init__(self, name, domain, state = None):
-        self.name = "VAR_" + name           # Name of our constraint
-        self.domain = list(domain)          # Values it can take
-        self.state = state                  # Base state is None
+        label, row, col = (name.rsplit("_", 2) + [None, None])[:3]
+        if row is not None and col is not None and row.isdigit() and col.isdigit():
+            self.label, self.row, self.col = label, int(row), int(col)  # Coordinates, parsed once
+        else:
+            self.label, self.row, self.col = name, None, None
+        self.mask = maskOf(domain)          # Values it can take
+        self.code = CODES.get(state, UNASSIGNED)    # Base state is unassigned
+        self.observers = []                 # Objects notified of state changes (stateChanged(var, oldCode, newCode))
 
     def __str__(self):
         return "Variable {} | State : {} | Domain : {}\n".format(self.name, self.state, self.domain)
-    
+
+    @property
+    def name(self):
+        if self.row is None:
+            return "VAR_" + self.label
+        return "VAR_{}_{}_{}".format(self.label, self.row, self.col)
+
+    @property
+    def state(self):
+        return SYMBOLS[self.code]
+
+    @state.setter
+    def state(self, state):
+        self.setState(state)
+
+    @property
+    def domain(self):
+        return symbolsOf(self.mask)
+
+    @domain.setter
+    def domain(self, values):
+        self.mask = maskOf(values)
+
+    @property
+    def domainSize(self):
+        return MASK_SIZE[self.mask]
+
 
     def setState(self, state):
         '''Function to set the state "properly". Verifying that the state passed as a parameter is in the domain.'''
-        
-        if state in self.domain or state == "0" or state == None:   # Check if state is in the domain, or 0, or None (for u)
-            self.state = state                                      # Assign domain
-            pass
-        else:
-            pass # Do nothing...
-    
+        code = CODES.get(state)
+        if code is not None:                                        # Unknown symbols are ignored
+            self.setCode(code)
+
+
+    def setCode(self, code):
+        '''Same as setState, with the code of the state.'''
+        if code == UNASSIGNED or self.mask >> code & 1:             # Check if the code is in the domain, or unassigned
+            if code != self.code:
+                for observer in self.observers:                     # Notify the observers (line counters...) of the change
+                    observer.stateChanged(self, self.code, code)
+                self.code = code                                    # Assign domain
+
 
 
 class Constraint:
     '''Class used t define constraints. Scope are variables related to this constraint.'''
 
-    def __init__(self, name, scope, function = lambda: True):
+    __slots__ = ("name", "scope", "function", "variables")    # Boards hold hundreds of constraints each
+
+    def __init__(self, name, scope, function = lambda: True, variables = None):
         self.name = "CONS_" + name  # Name of our constraint
         self.scope = list(scope)    # Scope of the constraint => Variables related to our constraint
         self.function = function    # Assigning the bool function that states if our constraint is respected or not. If nothing specified, we return True no matter what
 
+        # Variables whose state is read by the constraint, used to index it.
+        # By default, the Variable entries of the scope. Grid-scoped constraints (scope being a matrix, or ships + grid) must pass them explicitly.
+        if variables is None:
+            variables = [value for value in self.scope if isinstance(value, Variable)]
+        self.variables = list(variables)
+
     def __str__(self):
         return self.name
 
@@ -61,16 +125,18 @@ class CSP:
     
 
 
-def solutionGridBuilder(solution, rows=6, cols=6):
-    '''Returns a matrix representing the grid of a solution. Solution is inputed as a dictionnary.'''
+def solutionGridBuilder(solution, rows=None, cols=None):
+    '''Returns a matrix representing the grid of a solution. Solution is inputed as a dictionnary. The size is read from the variables if not given.'''
+
+    if rows is None or cols is None:
+        rows = max(var.row for var in solution) + 1
+        cols = max(var.col for var in solution) + 1
 
     matrix = [["" for _ in range(cols)] for _ in range(rows)]   # Create an "empty" row*col matrix.
 
     # Fill the matrix
     for var, value in solution.items():             # For all items in the solution dictionary (var, corresponding value)
-        __, ___, row, col = var.name.split("_")     # Extract coordinates from variable name. Split on "_". Variables formated as VAR_NAME_ROW_COL
-        row, col = int(row), int(col)               # Turn the row and col values to integers
-        matrix[row][col] = value                    # Assign to the row/col coordinates the vaue.
+        matrix[var.row][var.col] = value            # Assign to the row/col coordinates of the variable the value.
 
     return matrix                                   # Return the matrix
 
@@ -82,56 +148,188 @@ def defineLineConstraints(bspb, gridVar, direction, label="Line"):
     Function to define a "linear constraint". Direction being horizontal or vertical.
     We build an array with the target value and a line's variables.
     GridVar is a matrix [[],[],[]]. Each array in the matrix is either a row or a column.
-    We concatenate the target and the values and create a constraint on this array.
-    The associated function is "isLineRespected". See its definition in ConstraintDefinition.py
+    We concatenate a LineCounter (holding the target) and the values and create a constraint on this array.
+    The associated function is "isLineCountRespected". See its definition in ConstraintDefinition.py
     '''
 
     lineCount = 0                               # Count how many lines we dealt with yet
     for line in gridVar:                        # For every line in GridVar (= for every row or every col)
         array = []                              # Initialize an array
-        array.append(direction[lineCount])      # We add the target value. Direction is an array where each value with id=i is the target variable of line n°i
+        counter = LineCounter(direction[lineCount], line)   # Running counts of the line. Direction is an array where each value with id=i is the target variable of line n°i
+        for value in line:
+            value.observers.append(counter)     # The counter follows the state changes of each cell of the line
+        array.append(counter)                   # We add the counter (and its target value)
 
         for value in line:                      # For every value in the line
             array.append(value)                 # We add this value to our array, thus after the target value
 
-        cons = Constraint("{}_{}".format(label, lineCount), array, isLineRespected)   # We build a constraint based on this array, with function isLineRespected.
+        cons = Constraint("{}_{}".format(label, lineCount), array, isLineCountRespected)  # We build a constraint based on this array, with function isLineCountRespected.
         bspb.constraints.append(cons)           # We add the constraint to the battleship CSP problem given as parameter
         lineCount +=1                           # We add one line to the final count
 
 def defineTypeConstraint(bspb, gridVar):
+    '''Defines the shape constraint of every cell (stateConstraint), reading its neighbours through the grid topology.'''
+
+    topo = topology(len(gridVar), len(gridVar[0]))
+    cells = topo.pad(gridVar)                       # Shared by the constraints of the grid
 
     row = 0
     for line in gridVar:
         col = 0
         for value in line:
-            array = []
-            array.append(value)
-            array.append(gridVar)
+            array = [value, cells, topo]
 
-            cons = Constraint("TypeOf_{}_{}".format(row,col), array, stateConstraint)
+            cons = Constraint("TypeOf_{}_{}".format(row,col), array, stateConstraint, [value])   # Indexed on the cell only, the grid being its context
             bspb.constraints.append(cons)
 
             col += 1
 
         row += 1
 
+def buildIncidenceIndex(variables, constraints):
+    '''
+    Builds the variable -> constraints index of a problem.
+    Each variable is mapped to the list of constraints that read its state, in the order of the constraints list.
+    '''
+    incidence = {var: [] for var in variables}     # Every variable gets an entry, even if no constraint involves it
+    for cons in constraints:                        # For every constraint
+        for var in cons.variables:                  # We register it for each variable it involves
+            incidence[var].append(cons)
+
+    return incidence
+
+
+def buildReadersIndex(incidence, constraints, neighbours):
+    '''
+    Builds the variable -> constraints index used by LCV: the constraints a value of the variable can break.
+    Those indexed on it (see buildIncidenceIndex), plus the shape and no-touch constraints of its 8 neighbours,
+    which read its state through the grid while being indexed on their own cell only.
+    incidence itself isn't widened: is_consistent and forward checking keep checking the constraints of the variable.
+    '''
+    local = {}                                      # Cell -> its own shape and no-touch constraints
+    for cons in constraints:
+        if cons.function in (stateConstraint, surroundedByWaterAt):
+            local.setdefault(cons.scope[0], []).append(cons)
+
+    return {var: incidence[var] + [cons for neighbor, __, ___ in neighbours[var] for cons in local.get(neighbor, [])]
+            for var in incidence}
+
+
+def defineProximityConstraint(bspb, gridVar):
+    '''
+    Defines the no-touch constraints: one local constraint per cell (surroundedByWaterAt), indexed on that cell,
+    and the full-board one (surroundedByWater), indexed on no variable so it's only used to validate complete grids.
+    '''
+    topo = topology(len(gridVar), len(gridVar[0]))
+    cells = topo.pad(gridVar)
+    for row, line in enumerate(gridVar):
+        for col, value in enumerate(line):
+            cons = Constraint("PROX_{}_{}".format(row, col), [value, cells, topo], surroundedByWaterAt, [value])
+            bspb.constraints.append(cons)
+
+    cons = Constraint("PROX", gridVar, surroundedByWater, [])
+    bspb.constraints.append(cons)
+
+
+def usesHeuristic(heuristic, name):
+    '''Heuristics can be combined with "+" (i.e. "MRV+LCV"). Returns True if name is one of them.'''
+    return heuristic is not None and name in heuristic.split("+")
+
+
+class MRVQueue:
+    '''
+    Priority queue of the unassigned variables for the MRV heuristic: smallest current domain first,
+    then highest degree (number of unassigned neighbours), then row-major order.\n
+    Backed by a heap with lazy updates: a variable is pushed again whenever its key can have decreased
+    (domain pruned, neighbour unassigned). Only the entry with the last key pushed for a variable (self.keys) is live,
+    the others are dropped when they reach the top, and the heap is rebuilt from the live entries when they are
+    outnumbered, so its size stays proportional to the number of variables.
+    '''
+    def __init__(self, variables, neighbours):
+        self.neighbours = neighbours                            # Variable -> [(neighbor, dx, dy)]
+        self.order = {var: i for i, var in enumerate(variables)}
+        self.keys = {var: self.key(var) for var in variables if var.code == UNASSIGNED}    # Key of the live entry of each variable
+        self.heap = [key + (var,) for var, key in self.keys.items()]
+        heapq.heapify(self.heap)
+
+    def degree(self, var):
+        return sum(1 for neighbor, __, ___ in self.neighbours[var] if neighbor.code == UNASSIGNED)
+
+    def key(self, var):
+        return (var.domainSize, -self.degree(var), self.order[var])
+
+    def push(self, var):
+        if var.code == UNASSIGNED:
+            key = self.key(var)
+            if self.keys.get(var) != key:                       # Same key: the live entry is still right
+                self.keys[var] = key
+                heapq.heappush(self.heap, key + (var,))
+                if len(self.heap) > 2 * len(self.keys) + 64:    # Mostly dead entries: keep the live ones only
+                    self.heap = [key + (var,) for var, key in self.keys.items()]
+                    heapq.heapify(self.heap)
+
+    def select(self, assignment):
+        '''Returns the unassigned variable with the smallest key (None if there's none left). It stays in the queue until assigned.'''
+        while self.heap:
+            entry = self.heap[0]
+            var = entry[-1]
+            if self.keys.get(var) != entry[:-1]:                # Replaced by a newer entry: drop it
+                heapq.heappop(self.heap)
+                continue
+            if var in assignment or var.code != UNASSIGNED:     # Assigned since: drop the entry
+                heapq.heappop(self.heap)
+                del self.keys[var]
+                continue
+            key = self.key(var)
+            if key != entry[:-1]:                               # Key increased since (domain restored, neighbour assigned)
+                self.keys[var] = key
+                heapq.heapreplace(self.heap, key + (var,))
+                continue
+            return var
+        return None
+
+
+def solveSubproblem(job):
+    '''
+    Worker of BattleShipProblem.parallel_search: solves one subproblem (a puzzle whose hints include a prefix of the search).
+    job is (puzzle, method, heuristic). Returns (solution grid or None, steps).
+    '''
+    puzzle, method, heuristic = job
+    bsp = BattleShipProblem("Subproblem", puzzle=puzzle)
+    solution = bsp.solve(method, heuristic)
+    if solution is None:
+        return None, bsp.steps
+    return [[var.state for var in row] for row in bsp.gridVarRow], bsp.steps
+
+
 class BattleShipProblem(CSP):
     '''
     Class for Battleship problem definiton and solving.
     Based on the CSP class.
     '''
 
-    def __init__(self, name, filepath):
-        
+    def __init__(self, name, filepath=None, puzzle=None):
+        '''The puzzle is read from filepath, or given as puzzle = (horizontal, vertical, ships, grid) as returned by parse_battleship_input.'''
+
         super().__init__(name=name, variables=[], constraints=[])               # Initialize the CSP class
-        
-        horizontal, vertical, ships, grid = parse_battleship_input(filepath)    # Get the grid, ships, target line values from the filepath, using the parse input function
+
+        if puzzle is None:
+            puzzle = parse_battleship_input(filepath)                           # Get the grid, ships, target line values from the filepath, using the parse input function
+        horizontal, vertical, ships, grid = puzzle
 
         self.grid = grid                                                        # Defining the "grid" as an array
         self.gridVarRow = []                                                    # Initialize the gridVarRow, a matrix where each element is an array representing a row
         self.gridVarCol = []                                                    # Initialize the gridVarRow, a matrix where each element is an array representing a column
         self.domain = ['.', 'M', '<', '>', '^', 'v', 'S']                       # Defining the domain
         self.steps = 0                                                          # Initialize a step counter to compare performances
+        self.trail = []                                                         # Undo log of the domain values removed by forward checking
+        self.revisions = 0                                                      # Number of arc revisions done by AC-3 (mac)
+        self.mrvQueue = None                                                    # Priority queue of the variables when using the MRV heuristic
+        self.conflicts = None                                                   # Conflicts left in the grid returned by min_conflicts
+        self.pruned = 0                                                         # Number of domain values removed by AC-3 (mac)
+        self.stats = None                                                       # SolverStats while instrumented (see instrument)
+        self.nogoods = None                                                     # NogoodTable of the last forward checking search using one
+        self.zobrist = None                                                     # ZobristBand of the grid while searching with nogoods
 
         self.horizontal = horizontal                # Used to return these values if needed
         self.vertical = vertical                    # Used to return these values if needed
@@ -166,30 +364,117 @@ class BattleShipProblem(CSP):
         
         defineLineConstraints(self, self.gridVarRow, horizontal, "ROW")     # Using defineLine function to set the row constraints
         defineLineConstraints(self, self.gridVarCol, vertical, "COL")       # Using defineLine function to set the col constraints
-        cons = Constraint("PROX", self.gridVarRow, surroundedByWater)
-        self.constraints.append(cons)
-        self.shipsAndGrid = [self.ships, self.gridVarRow, lambda: self.finished]
-        cons = Constraint("SHIPS", self.shipsAndGrid, shipCounter)
+        defineProximityConstraint(self, self.gridVarRow)                   # No-touch constraints (local per cell + full-board validator)
+        self.shipTracker = ShipTracker(self.gridVarRow)                      # Live ship counts, following every state change
+        for var in self.variables:
+            var.observers.append(self.shipTracker)
+        self.shipsAndGrid = [self.ships, self.shipTracker, lambda: self.finished]
+        cons = Constraint("SHIPS", self.shipsAndGrid, isFleetRespected, self.variables)   # Grid-scoped: every cell is involved
         self.constraints.append(cons)
         defineTypeConstraint(self, self.gridVarRow)
 
+        self.incidence = buildIncidenceIndex(self.variables, self.constraints)  # Constraints involving each variable, built once
+
+        # 8-neighbourhood of every cell, as (neighbor, dx, dy)
+        topo = topology(len(self.gridVarRow), len(self.gridVarRow[0]))
+        self.neighbours = {var: [(self.variables[j], dx, dy) for j, dx, dy in topo.around[i]] for i, var in enumerate(self.variables)}
+        self.readers = buildReadersIndex(self.incidence, self.constraints, self.neighbours)     # Constraints LCV scores each variable on
 
-    def solve(self, method, h):
+
+    def solve(self, method, h, **options):
         '''
-        To call different solvers.\n
+        To call different solvers. The heuristic h can be None, "LCV", "MRV" or "MRV+LCV" (ignored by bitboard).\n
         Available solvers :\n
             "backtracking"\n
-            "backtracking_forwardchecking"\n
+            "backtracking_forwardchecking" (option nogoods = size of the nogood table, see backtracking_search_fc)\n
+            "bitboard" (heuristic ignored)\n
+            "backtracking_iterative"\n
+            "backtracking_forwardchecking_iterative"\n
+            "mac" (backtracking maintaining arc consistency)\n
+            "placement" (places whole ships, heuristic ignored)\n
+            "min_conflicts" (local search, heuristic ignored, options passed to min_conflicts_search)\n
+            "patterns" (chooses whole row/column patterns, heuristic ignored)\n
+            "parallel" (splits the search over a process pool, options passed to parallel_search)\n
+            "sat" (CNF encoding and CDCL solver, heuristic ignored, options passed to sat_search)\n
         Returns solution (dictionary)
         '''
         if(method == "backtracking"):
             return self.backtracking_search(heuristic=h)
         elif(method == "backtracking_forwardchecking"):
-            return self.backtracking_search_fc(heuristic=h)
+            return self.backtracking_search_fc(heuristic=h, **options)
+        elif(method == "bitboard"):
+            return self.bitboard_search()
+        elif(method == "backtracking_iterative"):
+            return self.backtracking_search_iterative(heuristic=h)
+        elif(method == "backtracking_forwardchecking_iterative"):
+            return self.backtracking_search_fc_iterative(heuristic=h)
+        elif(method == "mac"):
+            return self.mac_search(heuristic=h)
+        elif(method == "placement"):
+            return self.placement_search()
+        elif(method == "min_conflicts"):
+            return self.min_conflicts_search(**options)
+        elif(method == "patterns"):
+            return self.pattern_search()
+        elif(method == "parallel"):
+            return self.parallel_search(heuristic=h, **options)
+        elif(method == "sat"):
+            return self.sat_search(**options)
         else:
             return None
     
 
+    def iter_solutions(self, method="backtracking_forwardchecking", h=None):
+        '''
+        Generator of every solution of the problem (dictionaries, like solve), each one once. The search only goes on
+        when the next solution is asked for, so stopping after k solutions costs about the search up to the k-th one.\n
+        Available solvers : "backtracking", "backtracking_forwardchecking" (and their "_iterative" names, same search)
+        and "placement" (heuristic ignored). While the generator is suspended, the variables hold the last solution.
+        '''
+        self.reset()
+        if method in ["backtracking", "backtracking_iterative", "backtracking_forwardchecking", "backtracking_forwardchecking_iterative"]:
+            assignment = self.getAssigned()
+            self.mrvQueue = self.mrv_queue(h, pruning="forwardchecking" in method)
+            for solution in self.iterate_solutions(assignment, h, forward_checking="forwardchecking" in method):
+                yield dict(solution)
+        elif method == "placement":
+            grid = [[var.state for var in row] for row in self.gridVarRow]
+            solver = PlacementSolver(grid, self.horizontal, self.vertical, self.ships)
+            steps = self.steps
+            for solutionGrid in solver.iterSolutions():
+                self.steps = steps + solver.steps
+                yield self.assignGrid(solutionGrid)
+            self.steps = steps + solver.steps
+            self.reset()
+        else:
+            raise ValueError("Solution enumeration isn't available for the solver {}".format(method))
+
+
+    def count_solutions(self, limit=None, method="backtracking_forwardchecking", h=None):
+        '''Counts the solutions (see iter_solutions), stopping as soon as limit solutions are found (all of them if limit is None).'''
+        count = 0
+        for __ in self.iter_solutions(method, h):
+            count += 1
+            if count == limit:
+                break
+        return count
+
+
+    def is_unique(self, method="backtracking_forwardchecking", h=None):
+        '''True if the puzzle has exactly one solution. The search stops at the second solution.'''
+        return self.count_solutions(2, method, h) == 1
+
+
+    def reset(self):
+        '''Puts the problem back in its initial state (hints only, full domains), so it can be searched again.'''
+        self.mrvQueue = None
+        self.undo_trail(0)
+        for row, line in zip(self.gridVarRow, self.grid):
+            for var, value in zip(row, line):
+                var.setState(value)
+        self.finished = False
+
+
     def getAssigned(self):
         '''
         Storing all unassigned variables and their state to a dictionnary.\n
@@ -198,7 +483,7 @@ class BattleShipProblem(CSP):
         assignment = {}
         for row in self.gridVarRow:
             for col in row:
-                if(col.state != '0'):
+                if(col.code != UNASSIGNED):
                     assignment[col] = col.state
 
 
@@ -211,6 +496,7 @@ class BattleShipProblem(CSP):
         If it finds a solution, its yielded as a dictionnary, where each variable of our problem has an associated state.
         '''
         assignment = self.getAssigned()
+        self.mrvQueue = self.mrv_queue(heuristic, pruning=False)
         return self.recursive_backtracking(assignment, heuristic)  # Start backtracking recursion
         
 
@@ -227,7 +513,7 @@ class BattleShipProblem(CSP):
             return None                                     # We return None, as no new variable is available
 
         active = False
-        if (heuristic == "LCV"):                            # If the heuristic is defined as LCV, we "activate" the least constraing values function
+        if usesHeuristic(heuristic, "LCV"):                            # If the heuristic is defined as LCV, we "activate" the least constraing values function
             active = True
 
         for value in self.least_constraining_values(var, active):   # Otherwise, for every value in the variable's domain... (domained being ordered or not depending on LCV)
@@ -247,6 +533,7 @@ class BattleShipProblem(CSP):
                 # Backtrack                                  If we ever come back to this place, it means that result was None, meaning that no solution was found
                 del assignment[var]                         # We delete the assignment in our solution
                 var.setState('0')                          # And set the state back to None (or 0, which would mean unassigned)
+                self.release(var)                           # The variable can be selected again
         return None                                         # After having check all the possible value, if no solution was found we return None
 
 
@@ -254,13 +541,30 @@ class BattleShipProblem(CSP):
 
 
 
-    def backtracking_search_fc(self, assignment = {}, heuristic = None):
+    def backtracking_search_fc(self, assignment = {}, heuristic = None, nogoods = None):
         '''
         Perform a backtracking search with forward checking.\n
         Same function as backtracking_search but calling the forward checking recursion.
+        With nogoods = N, the partial grids proven to have no solution are remembered in a table of at most N keys
+        (see Nogoods.py and nogood_key), and the search cuts the subtrees reaching one of them again.
+        self.nogoods.stats() then gives the hit rate and memory use of the table.
         '''
         assignment = self.getAssigned()
-        return self.recursive_backtracking_fc(assignment, heuristic)  # Start backtracking recursion
+        self.mrvQueue = self.mrv_queue(heuristic)
+        if not nogoods:
+            return self.recursive_backtracking_fc(assignment, heuristic)  # Start backtracking recursion
+
+        self.nogoods = NogoodTable(nogoods)
+        self.zobrist = ZobristBand(self.gridVarRow)
+        self.lineCounters = [cons.scope[0] for cons in self.constraints if cons.scope and isinstance(cons.scope[0], LineCounter)]
+        for var in self.variables:
+            var.observers.append(self.zobrist)
+        try:
+            return self.recursive_backtracking_fc(assignment, heuristic)
+        finally:
+            for var in self.variables:
+                var.observers.remove(self.zobrist)
+            self.zobrist = None
         
 
     def recursive_backtracking_fc(self, assignment, heuristic):
@@ -273,17 +577,22 @@ class BattleShipProblem(CSP):
         if self.is_complete(assignment):                    # If assignment is complete (all variables assignated + constraints validated)
             return assignment                               # We return the solution 
 
+        if self.zobrist is not None:                        # Nogoods: this partial grid may already be known to fail
+            key = self.nogood_key()
+            if self.nogoods.contains(key):
+                return None
+
         var = self.select_unassigned_variable(assignment)   # (Else) We select and unassigned variable
 
         if not var:                                         # If we don't get a variable
             return None                                     # We return None, as no new variable is available
 
         active = False
-        if (heuristic == "LCV"):                            # Eventually activate LCV
+        if usesHeuristic(heuristic, "LCV"):                            # Eventually activate LCV
             active = True
 
-        # Make a copy of the original domains for restoring during backtracking
-        original_domains = {v: list(v.domain) for v in self.variables}
+        # Mark the trail, to undo the domain changes made below it when backtracking
+        mark = len(self.trail)
 
         for value in self.least_constraining_values(var, active):      # Otherwise, for every value in the variable's domain...
             if len(assignment) == len(self.variables)-1:
@@ -295,48 +604,510 @@ class BattleShipProblem(CSP):
                 assignment[var] = value                     # And add this change to our final solution
 
                 # Forward checking: Update domains of unassigned variables
-                if self.forward_check(var):
+                if self.forward_check(var) and (self.zobrist is None or self.closed_cells_consistent(var)):
                     result = self.recursive_backtracking_fc(assignment, heuristic)  # Continue recursively
                     if result is not None:
                         return result                       # If result isn't None we can return the solution we found
 
                 # Restore domains if forward checking fails
-                self.restore_domains(original_domains)
+                self.undo_trail(mark)
 
                 # Backtrack                                  If we ever come back to this place, it means that result was None, meaning that no solution was found
                 del assignment[var]                         # We delete the assignment in our solution
                 var.setState('0')                          # And set the state back to None (or 0, which would mean unassigned)
+                self.release(var)                           # The variable can be selected again
+
+        if self.zobrist is not None:                        # Every value failed: this partial grid has no solution
+            self.nogoods.add(key)
         return None                                        # After having check all the possible value, if no solution was found we return None
 
 
+    def backtracking_search_iterative(self, assignment = {}, heuristic = None):
+        '''
+        Same search as backtracking_search (same result and steps), without recursion.
+        '''
+        assignment = self.getAssigned()
+        self.mrvQueue = self.mrv_queue(heuristic, pruning=False)
+        return self.iterative_backtracking(assignment, heuristic, forward_checking=False)
+
+
+    def backtracking_search_fc_iterative(self, assignment = {}, heuristic = None):
+        '''
+        Same search as backtracking_search_fc (same result and steps), without recursion.
+        '''
+        assignment = self.getAssigned()
+        self.mrvQueue = self.mrv_queue(heuristic)
+        return self.iterative_backtracking(assignment, heuristic, forward_checking=True)
+
+
+    def iterative_backtracking(self, assignment, heuristic, forward_checking):
+        '''
+        Backtracking (with or without forward checking) using an explicit stack of choice points instead of recursion,
+        so the board size isn't limited by the recursion limit. Returns the first solution found (see iterate_solutions).
+        '''
+        return next(self.iterate_solutions(assignment, heuristic, forward_checking), None)
+
+
+    def iterate_solutions(self, assignment, heuristic, forward_checking):
+        '''
+        Generator behind iterative_backtracking: yields assignment each time it is a solution, then goes on searching
+        as if that node had failed, until the search space is exhausted.\n
+        Each choice point is [variable, iterator over its values, trail mark, True if the variable currently holds a value].
+        The steps are counted exactly like recursive_backtracking and recursive_backtracking_fc.
+        '''
+        active = usesHeuristic(heuristic, "LCV")
+        stack = []
+
+        while True:
+            # Entering a new node (a recursive call)
+            self.steps += 1
+
+            if self.is_complete(assignment):
+                yield assignment                                # Then backtrack to look for the next solution
+            else:
+                var = self.select_unassigned_variable(assignment)
+                if var:                                         # No variable: the node fails, its parent tries its next value
+                    stack.append([var, iter(self.least_constraining_values(var, active)), len(self.trail), False])
+
+            # Find the next value to go down with, backtracking as long as choice points are exhausted
+            while stack:
+                point = stack[-1]
+                var = point[0]
+
+                if point[3]:                                    # Coming back from a failed child: undo its value
+                    self.undo_trail(point[2])
+                    del assignment[var]
+                    var.setState('0')
+                    self.release(var)
+                    point[3] = False
+
+                for value in point[1]:
+                    if len(assignment) == len(self.variables)-1:
+                        self.finished = True
+                    else:
+                        self.finished = False
+                    if self.is_consistent(var, value):
+                        var.setState(value)
+                        assignment[var] = value
+                        point[3] = True
+
+                        if not forward_checking or self.forward_check(var):
+                            break                               # Go down
+
+                        self.undo_trail(point[2])               # Forward checking failed
+                        del assignment[var]
+                        var.setState('0')
+                        self.release(var)
+                        point[3] = False
+
+                if point[3]:
+                    break                                       # Enter the child node
+                stack.pop()                                     # No value left: this node fails too
+
+            if not stack:
+                return
+
+
+    def mac_search(self, assignment = {}, heuristic = None):
+        '''
+        Perform a backtracking search maintaining arc consistency.\n
+        AC-3 runs once on the whole grid before searching, then after each assignment instead of forward checking.
+        The number of arc revisions and of pruned values are counted in self.revisions and self.pruned.
+        '''
+        assignment = self.getAssigned()
+        self.mrvQueue = self.mrv_queue(heuristic)
+
+        # Lines of every cell, used with its neighbours to build the arcs
+        self.arcLines = {var: [obs for obs in var.observers if isinstance(obs, LineCounter)] for var in self.variables}
+
+        # Preprocessing: every arc and every line
+        worklist = [(var, neighbor, dx, dy) for var in self.variables for neighbor, dx, dy in self.neighbours[var]]
+        worklist += [cons.scope[0] for cons in self.constraints if cons.scope and isinstance(cons.scope[0], LineCounter)]
+        if not self.ac3(worklist):
+            return None
+
+        return self.recursive_mac(assignment, heuristic)
+
+
+    def recursive_mac(self, assignment, heuristic):
+        '''
+        Recursive backtracking function maintaining arc consistency.\n
+        Copy of recursive backtracking with forward checking, running AC-3 from the assigned variable instead.
+        '''
+        self.steps += 1
+
+        if self.is_complete(assignment):
+            return assignment
+
+        var = self.select_unassigned_variable(assignment)
+
+        if not var:
+            return None
+
+        active = False
+        if usesHeuristic(heuristic, "LCV"):
+            active = True
+
+        mark = len(self.trail)
+
+        for value in self.least_constraining_values(var, active):
+            if len(assignment) == len(self.variables)-1:
+                self.finished = True
+            else:
+                self.finished = False
+            if self.is_consistent(var, value):
+                var.setState(value)
+                assignment[var] = value
+
+                # Propagate from var: arcs of its neighbours towards it, and its lines
+                worklist = [(neighbor, var, -dx, -dy) for neighbor, dx, dy in self.neighbours[var]] + self.arcLines[var]
+                if self.ac3(worklist):
+                    result = self.recursive_mac(assignment, heuristic)
+                    if result is not None:
+                        return result
+
+                self.undo_trail(mark)
+
+                del assignment[var]
+                var.setState('0')
+                self.release(var)
+        return None
+
+
+    def current_mask(self, var):
+        '''Codes var can still take, as a bitmask: its state if assigned, its domain otherwise.'''
+        if var.code != UNASSIGNED:
+            return 1 << var.code
+        return var.mask
+
+
+    def ac3(self, worklist):
+        '''
+        AC-3 propagation. The worklist holds arcs (var, neighbor, dx, dy), var being revised against its neighbor at offset (dx, dy),
+        and LineCounters, whose line is revised against its target.
+        Every variable whose domain shrinks puts back the arcs pointing to it and its lines.
+        Returns False if a domain becomes empty.
+        '''
+        queue = deque(worklist)
+        queued = set(queue)
+
+        while queue:
+            item = queue.popleft()
+            queued.discard(item)
+            self.revisions += 1
+
+            if isinstance(item, LineCounter):
+                changed = self.revise_line(item)
+            else:
+                changed = self.revise_arc(*item)
+
+            if changed is None:                                     # Wipeout
+                return False
+
+            for var in changed:
+                for neighbor, dx, dy in self.neighbours[var]:
+                    arc = (neighbor, var, -dx, -dy)
+                    if neighbor.code == UNASSIGNED and arc not in queued:
+                        queue.append(arc)
+                        queued.add(arc)
+                for line in self.arcLines[var]:
+                    if line is not item and line not in queued:
+                        queue.append(line)
+                        queued.add(line)
+        return True
+
+
+    def revise_arc(self, var, neighbor, dx, dy):
+        '''
+        Removes the values of var that no value of neighbor supports (see compatibleNeighbours and NEIGHBOUR_SUPPORTS).
+        Returns the list of changed variables, or None if var has no value left.
+        '''
+        if var.code != UNASSIGNED:                                  # Assigned variables are never pruned
+            return []
+
+        supports = NEIGHBOUR_SUPPORTS[(dx, dy)]
+        supported = 0
+        for code in MASK_CODES[self.current_mask(neighbor)]:
+            supported |= supports[code]
+        return self.prune_arc_values(var, var.mask & supported)
+
+
+    def revise_line(self, line):
+        '''
+        Revises the cells of a line against its target: once enough cells must be ships, the others can only be water,
+        and if just enough cells can still be ships, they all have to.
+        Returns the list of changed variables, or None if the line can't reach its target.
+        '''
+        mustShip, canShip = 0, 0
+        for var in line.variables:
+            mask = self.current_mask(var)
+            if not mask & WATER_BIT:
+                mustShip += 1
+            if mask != WATER_BIT:
+                canShip += 1
+
+        if mustShip > line.target or canShip < line.target:
+            return None
+
+        changed = []
+        for var in line.variables:
+            if var.code != UNASSIGNED or not var.mask & WATER_BIT or var.mask == WATER_BIT:   # Assigned, or already decided
+                continue
+            if mustShip == line.target:
+                mask = WATER_BIT
+            elif canShip == line.target:
+                mask = var.mask & ~WATER_BIT
+            else:
+                continue
+            changed += self.prune_arc_values(var, mask)
+        return changed
+
+
+    def prune_arc_values(self, var, mask):
+        '''Prunes var's domain to the codes of mask for AC-3, counting the removed values. Returns [var] if it changed, [] if not, None on a wipeout.'''
+        if mask == var.mask:
+            return []
+        self.pruned += MASK_SIZE[var.mask] - MASK_SIZE[mask]
+        self.prune(var, mask)
+        if not mask:
+            return None
+        return [var]
+
+
+    def placement_search(self):
+        '''
+        Solves the problem by placing the ships of the fleet (see PlacementSolver.py) instead of assigning cells.\n
+        The solution is written back to the variables and returned as a dictionary, like the other solvers.
+        '''
+        grid = [[var.state for var in row] for row in self.gridVarRow]
+        solver = PlacementSolver(grid, self.horizontal, self.vertical, self.ships)
+        solutionGrid = solver.solve()
+        self.steps += solver.steps
+
+        if solutionGrid is None:
+            return None
+        return self.assignGrid(solutionGrid)
+
+
+    def parallel_search(self, heuristic = None, inner = "backtracking_forwardchecking", workers = None, split = 8):
+        '''
+        Solves the problem over a pool of worker processes (os.cpu_count() by default).\n
+        The first levels of the search tree are expanded with forward checking until there are at least split * workers
+        consistent prefixes. Each prefix, added to the hints, is an independent subproblem solved with the inner method (and heuristic).
+        The workers take the subproblems one at a time, in search order, so a worker done with an easy subproblem takes
+        the next one. As soon as one of them finds a solution, the pool is terminated.\n
+        self.steps counts the prefix expansion and the subproblems solved (not the ones cancelled).
+        Returns solution (dictionary), or None if no subproblem has one.
+        '''
+        workers = workers or multiprocessing.cpu_count()
+        prefixes = self.split_prefixes(split * workers)
+
+        jobs = []
+        for prefix in prefixes:
+            grid = [list(line) for line in self.grid]
+            for row, col, value in prefix:
+                grid[row][col] = value
+            jobs.append(((self.horizontal, self.vertical, self.ships, grid), inner, heuristic))
+
+        with multiprocessing.Pool(processes=workers) as pool:
+            for solutionGrid, steps in pool.imap_unordered(solveSubproblem, jobs, chunksize=1):
+                self.steps += steps
+                if solutionGrid is not None:
+                    pool.terminate()                                # Cancel the other subproblems
+                    return self.assignGrid(solutionGrid)
+        return None
+
+
+    def split_prefixes(self, count, max_depth=16):
+        '''
+        Returns the consistent prefixes (lists of (row, col, value)) of the shallowest search level having at least count of them,
+        in search order. Levels are expanded with forward checking, like recursive_backtracking_fc, in row-major order.
+        '''
+        assignment = self.getAssigned()
+        prefixes = []
+        for depth in range(1, max_depth + 1):
+            prefixes = []
+            self.collect_prefixes(assignment, depth, [], prefixes)
+            if len(prefixes) >= count or not prefixes:
+                break
+        return prefixes
+
+
+    def collect_prefixes(self, assignment, depth, prefix, prefixes):
+        '''Adds to prefixes every consistent prefix extending prefix by depth more variables (or less if the grid gets full).'''
+        self.steps += 1
+        var = self.select_unassigned_variable(assignment)
+        if depth == 0 or not var:
+            prefixes.append(list(prefix))
+            return
+
+        mark = len(self.trail)
+        for value in var.domain:
+            self.finished = len(assignment) == len(self.variables)-1
+            if self.is_consistent(var, value):
+                var.setState(value)
+                assignment[var] = value
+                if self.forward_check(var):
+                    prefix.append((var.row, var.col, value))
+                    self.collect_prefixes(assignment, depth - 1, prefix, prefixes)
+                    prefix.pop()
+                self.undo_trail(mark)
+                del assignment[var]
+                var.setState('0')
+
+
+    def sat_search(self, dimacs=None, max_conflicts=None):
+        '''
+        Compiles the problem into CNF (see SatEncoding.py) and solves it with the CDCL solver of CDCLSolver.py.
+        With dimacs = a file path, the CNF is also written there in the DIMACS format, for external SAT solvers.
+        self.steps counts the decisions of the solver. The solution is written back to the variables and returned as a dictionary.
+        '''
+        grid = [[var.state for var in row] for row in self.gridVarRow]
+        encoding = CNFEncoding(grid, self.horizontal, self.vertical, self.ships)
+        if dimacs is not None:
+            encoding.writeDIMACS(dimacs)
+
+        solver = CDCLSolver(encoding.numVars, encoding.clauses, encoding.preferredPhases())
+        model = solver.solve(max_conflicts=max_conflicts)
+        self.steps += solver.decisions
+
+        if model is None:
+            return None
+        return self.assignGrid(encoding.decode(model))
+
+
+    def pattern_search(self):
+        '''
+        Solves the problem by choosing a pattern for each whole row and column (see LinePatterns.py) instead of a symbol per cell.
+        The line patterns are cached across problems. The solution is written back to the variables and returned as a dictionary.
+        '''
+        grid = [[var.state for var in row] for row in self.gridVarRow]
+        solver = LinePatternSolver(grid, self.horizontal, self.vertical, self.ships)
+        solutionGrid = solver.solve()
+        self.steps += solver.steps
+
+        if solutionGrid is None:
+            return None
+        return self.assignGrid(solutionGrid)
+
+
+    def min_conflicts_search(self, max_steps=100000, tabu=5, restart_after=5000, max_restarts=None, noise=0.01, ship_moves=0.2, seed=None, approximate=False):
+        '''
+        Solves the problem with a min-conflicts local search (see MinConflicts.py). Quick on large satisfiable boards,
+        but it can't prove there is no solution: use the backtracking searches for that.\n
+        Returns the solution (dictionary), or None after max_steps. With approximate=True, the grid with the fewest conflicts
+        found is returned instead of None. self.conflicts holds the number of conflicts of the returned grid.
+        '''
+        grid = [[var.state for var in row] for row in self.gridVarRow]
+        solver = MinConflictsSolver(grid, self.horizontal, self.vertical, self.ships, seed=seed)
+        solutionGrid = solver.solve(max_steps=max_steps, tabu=tabu, restart_after=restart_after, max_restarts=max_restarts,
+                                   noise=noise, ship_moves=ship_moves)
+        self.steps += solver.steps
+
+        if solutionGrid is None:
+            if not approximate:
+                return None
+            solutionGrid = solver.best
+        self.conflicts = solver.bestCost
+        return self.assignGrid(solutionGrid)
+
+
+    def assignGrid(self, solutionGrid):
+        '''Sets every variable to its symbol in solutionGrid, and returns the assignment as a dictionary.'''
+        assignment = {}
+        for row, line in zip(self.gridVarRow, solutionGrid):
+            for var, value in zip(row, line):
+                var.setState(value)
+                assignment[var] = value
+
+        return assignment
+
+
+    def bitboard_search(self):
+        '''
+        Solves the problem with the bitmask engine (see BitBoard.py) instead of the Variable/Constraint objects.\n
+        The solution is written back to the variables and returned as a dictionary, like the other solvers.
+        '''
+        grid = [[var.state for var in row] for row in self.gridVarRow]
+        board = BitBoard(grid, self.horizontal, self.vertical, self.ships)
+        solutionGrid = board.solve()
+        self.steps += board.steps
+
+        if solutionGrid is None:
+            return None
+        return self.assignGrid(solutionGrid)
+
+
+    def nogood_key(self):
+        '''
+        Key of the current partial grid for the nogood table. Whether the grid can still be completed only depends on:
+            - the cells around the unassigned ones (the Zobrist band hash), the others being closed (see closed_cells_consistent),
+            - the ship segments of each line,
+            - the number of ships of each length, and the length of the ships reaching the band (they can still grow).
+        '''
+        tracker = self.shipTracker
+        return hash((self.zobrist.hash,
+                     tuple(counter.ships for counter in self.lineCounters),
+                     tuple(sorted((length, count) for length, count in tracker.counts.items() if count)),
+                     frozenset((i, tracker.size[tracker.find(i)]) for i in self.zobrist.band if tracker.isShip[i])))
+
+
+    def closed_cells_consistent(self, var):
+        '''
+        Checks the constraints of the cells closed by the assignment of var: var and its neighbours once their whole 3x3 square is assigned.
+        Forward checking can leave a closed cell breaking its shape rule until the final check. The nogood key ignores
+        the cells far from the unassigned ones, so they must not hide a failure.
+        '''
+        for cell in [var] + [neighbor for neighbor, __, ___ in self.neighbours[var]]:
+            if cell.code != UNASSIGNED and all(neighbor.code != UNASSIGNED for neighbor, __, ___ in self.neighbours[cell]):
+                if not all(cons.check() for cons in self.incidence[cell]):
+                    return False
+        return True
+
+
     def forward_check(self, var):
         '''
         Perform forward checking after assigning a value to var.
         '''
-        for constraint in self.constraints:
-            if var in constraint.scope:  # Check only relevant constraints
-                for neighbor in constraint.scope:
-                    # Ensure neighbor is a Variable and unassigned
-                    if isinstance(neighbor, Variable) and neighbor != var and neighbor.state == '0':
-                        # Filter neighbor's domain based on the constraint
-                        valid_values = []
-                        for value in neighbor.domain:
-                            neighbor.setState(value)
-                            if constraint.check():              # Check if value satisfies the constraint
-                                valid_values.append(value)
-                        neighbor.setState('0')                  # Reset state
-
-                        neighbor.domain = valid_values          # Update the domain of the neighbor
-
-                        if not valid_values:                    # If domain is empty, forward checking fails
-                            return False
+        for constraint in self.incidence[var]:  # Check only relevant constraints
+            for neighbor in constraint.scope:
+                # Ensure neighbor is a Variable and unassigned
+                if isinstance(neighbor, Variable) and neighbor != var and neighbor.code == UNASSIGNED:
+                    # Filter neighbor's domain based on the constraint
+                    valid = 0
+                    for code in MASK_CODES[neighbor.mask]:
+                        neighbor.setCode(code)
+                        if constraint.check():              # Check if value satisfies the constraint
+                            valid |= 1 << code
+                    neighbor.setCode(UNASSIGNED)            # Reset state
+
+                    self.prune(neighbor, valid)             # Update the domain of the neighbor
+
+                    if not valid:                           # If domain is empty, forward checking fails
+                        return False
         return True
 
 
-    def restore_domains(self, original_domains):
-        '''Restore the domains of all variables to the original state.'''
-        for var in self.variables:
-            var.domain = original_domains[var]
+    def prune(self, var, mask):
+        '''Reduces the domain of var to the codes of mask (see CellStates.py), logging its previous domain on the trail.'''
+        removed = var.mask & ~mask
+        if removed:
+            self.trail.append((var, var.mask))
+            var.mask &= mask
+            if self.mrvQueue is not None:       # Smaller domain: the variable moves up in the MRV queue
+                self.mrvQueue.push(var)
+            if self.stats is not None:
+                self.stats.pruned(self.depth(), MASK_SIZE[removed])
+
+
+    def undo_trail(self, mark):
+        '''
+        Puts back the domain values removed since the trail had length mark.
+        Entries are undone last first, so each variable ends up with the domain it had at the mark.
+        '''
+        while len(self.trail) > mark:
+            var, mask = self.trail.pop()
+            var.mask = mask
 
 
     def least_constraining_values(self, var, active):
@@ -344,7 +1115,7 @@ class BattleShipProblem(CSP):
         def count_constraints(value):
             var.setState(value)  # Temporarily assign the value
             constraints_violated = 0
-            for cons in self.constraints:
+            for cons in self.readers[var]:     # Constraints not reading var score the same for every value
                 if not cons.check():
                     constraints_violated += 1
             var.setState('0')  # Reset state
@@ -369,19 +1140,68 @@ class BattleShipProblem(CSP):
         print("-----------")                    # Print separator
 
 
+    def mrv_queue(self, heuristic, pruning=True):
+        '''
+        MRVQueue of the variables if heuristic uses MRV, else None.\n
+        Without domain pruning (pruning = False, plain backtracking), domains never shrink and MRV only orders by degree,
+        which is far slower than row-major order on these grids (323796 steps instead of 881 on Inputs/testInput.txt):
+        the variables are then taken in row-major order, as without MRV.
+        '''
+        if not usesHeuristic(heuristic, "MRV") or not pruning:
+            return None
+        return MRVQueue(self.variables, self.neighbours)
+
+
     def select_unassigned_variable(self, assignment):
         '''
         Selects an unassigned variable, passing the assignment as a parameter to know what variables are assigned.
-        Returns the next unassigned variable.
+        Returns the next unassigned variable: the first one in row-major order, or the one picked by the MRV queue when using the MRV heuristic.
         '''
-        
+        if self.mrvQueue is not None:
+            return self.mrvQueue.select(assignment)
+
         for var in self.variables:          # For all variables
-            if var not in assignment and var.state == '0':       # If var is not assigned
+            if var not in assignment and var.code == UNASSIGNED:  # If var is not assigned
                 return var                  # We return it
             
         return None                         # Otherwise we return None
 
 
+    def release(self, var):
+        '''Called when backtracking unassigns var: it goes back in the MRV queue, and its neighbours gain one degree.'''
+        if self.mrvQueue is not None:
+            self.mrvQueue.push(var)
+            for neighbor, __, ___ in self.neighbours[var]:
+                self.mrvQueue.push(neighbor)
+        if self.stats is not None:
+            self.stats.backtracked(self.depth())
+
+
+    def instrument(self, enabled=True):
+        '''
+        Turns the instrumentation on (or off with enabled=False) and returns the SolverStats collecting the measures
+        (see Instrumentation.py). The constraint functions are only wrapped while instrumented: when off, the searches
+        run the plain functions and only test self.stats on prunings and backtracks.
+        '''
+        for cons in self.constraints:
+            function = getattr(cons.function, "wrapped", cons.function)     # Already wrapped: start from the original
+            cons.function = function
+        self.stats = None
+
+        if enabled:
+            self.stats = SolverStats()
+            for cons in self.constraints:
+                cons.function = self.stats.wrap(cons)
+            self.rowCounters = [cons.scope[0] for cons in self.constraints if cons.name.startswith("CONS_ROW_")]
+            self.unknownCells = sum(1 for line in self.grid for value in line if value == '0')
+        return self.stats
+
+
+    def depth(self):
+        '''Search depth, for the instrumentation: number of cells assigned by the search (the hints aren't counted).'''
+        return self.unknownCells - sum(counter.unassigned for counter in self.rowCounters)
+
+
     def is_consistent(self, var, value):
         '''
         For the given variable, checks if setting its state to the value inputed as a parameter
@@ -389,8 +1209,8 @@ class BattleShipProblem(CSP):
         '''
         
         var.setState(value)                                 # Setting the state temporarily
-        for cons in self.constraints:                       # For all constraints in the bs problem
-            if var in cons.scope and not cons.check():      # If the variable is in its scope and breaks the constraints
+        for cons in self.incidence[var]:                    # For all constraints involving the variable
+            if not cons.check():                            # If the variable breaks the constraint
                 var.setState('0')                           # We set the state to 0
                 return False                                # And return false
 
@@ -400,41 +1220,3 @@ class BattleShipProblem(CSP):
     def is_complete(self, assignment):
         '''Check if all variables are assigned and all constraints are satisfied'''
         return len(assignment) == len(self.variables) and all(cons.check() for cons in self.constraints)
-        
-    
-
-
-
-def drawShips(grid: List[List[str]]) -> List[List[str]]:
-    rows, cols = len(grid), len(grid[0])
-    newGrid = [[None for _ in range(cols)] for _ in range(rows)]
-
-    for y in range(rows):
-        for x in range(cols):
-            if grid[y][x] == 'M':  # Found a ship cell
-                surrounding = getSurroundingTiles(grid, x, y)
-
-                # Determine ship type based on surrounding tiles
-                above = surrounding[0][1]
-                below = surrounding[2][1]
-                left = surrounding[1][0]
-                right = surrounding[1][2]
-
-                if above == 'M' and below == 'M':
-                    newGrid[y][x] = 'M'  # Part of vertical ship
-                elif left == 'M' and right == 'M':
-                    newGrid[y][x] = 'M'  # Part of horizontal ship
-                elif above == 'M':
-                    newGrid[y][x] = 'v'
-                elif below == 'M':
-                    newGrid[y][x] = '^'
-                elif left == 'M':
-                    newGrid[y][x] = '>'
-                elif right == 'M':
-                    newGrid[y][x] = '<'
-                else:
-                    newGrid[y][x] = 'S'  # Single tile ship
-            else:
-                newGrid[y][x] = '.'
-
-    return newGrid
\ No newline at end of file
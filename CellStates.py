@@ -0,0 +1,28 @@
+# Integer codes of the cell states, used by Variable (see CSPRequirements.py), the constraint functions, BitBoard and CNFEncoding.
+# Codes above WATER are ship segments. A domain is a bitmask of codes (bit code set = the state is possible).
+UNASSIGNED, WATER, MIDDLE, LEFT, RIGHT, TOP, BOTTOM, SUBMARINE = range(8)
+
+SYMBOLS = ['0', '.', 'M', '<', '>', '^', 'v', 'S']                 # Symbol of each code
+CODES = {symbol: code for code, symbol in enumerate(SYMBOLS)}       # Code of each symbol
+CODES[None] = UNASSIGNED                                            # None is unassigned too
+
+WATER_BIT = 1 << WATER
+FULL_MASK = sum(1 << code for code in range(WATER, SUBMARINE + 1))   # Every state but unassigned
+
+# Tables indexed by mask, for every mask of the 8 codes
+MASK_CODES = [tuple(code for code in range(len(SYMBOLS)) if mask >> code & 1) for mask in range(1 << len(SYMBOLS))]
+MASK_SIZE = [len(codes) for codes in MASK_CODES]                    # Popcount
+
+
+def maskOf(symbols):
+    '''Bitmask of a list of symbols. Symbols without a code are ignored.'''
+    mask = 0
+    for symbol in symbols:
+        if symbol in CODES:
+            mask |= 1 << CODES[symbol]
+    return mask
+
+
+def symbolsOf(mask):
+    '''Symbols of a bitmask, in code order.'''
+    return [SYMBOLS[code] for code in MASK_CODES[mask]]
@@ -1,4 +1,5 @@
 from GridSystem import *
+from CellStates import *
 from typing import List,Tuple
 
 def isLineRespected(array):
@@ -15,9 +16,9 @@ def isLineRespected(array):
     unassigned = 0                                                  # To count the unassigned values
 
     for var in array[1:]:                                           # For every variable in the array, from index 1 to the end
-        if var.state in ['S', 'M', '<', '>', '^', 'v']:             # If the state is a valid ship parts
+        if var.code > WATER:                                        # If the state is a valid ship parts
             count += 1                                              # We count 1 ship
-        elif var.state == None or var.state == '0':                 # Else if the state is None or 0
+        elif var.code == UNASSIGNED:                                # Else if the state is unassigned
             unassigned += 1                                         # We count an unassigned variable
 
     # We want to check that the boat count == the target
@@ -30,10 +31,51 @@ def isLineRespected(array):
     return count <= target and (count + unassigned) >= target
 
 
+class LineCounter:
+    '''
+    Running counts of the ship segments and unassigned cells of a line (row or column).
+    Registered as an observer of the line's variables, the counts follow every state change,
+    including the resets done when backtracking, so the line check never has to rescan the line.
+    '''
+    def __init__(self, target, line):
+        self.target = target                        # Number of ship segments expected in the line
+        self.variables = list(line)                 # Variables of the line
+        self.ships = 0                              # Ship segments currently in the line
+        self.unassigned = 0                         # Unassigned cells currently in the line
+
+        for var in self.variables:                  # Initial counts, from the current states (hints)
+            self.stateChanged(var, WATER, var.code)
+
+    def stateChanged(self, var, oldCode, newCode):
+        '''Updates the counts when a variable of the line goes from oldCode to newCode (see CellStates.py).'''
+        if oldCode > WATER:
+            self.ships -= 1
+        elif oldCode == UNASSIGNED:
+            self.unassigned -= 1
+
+        if newCode > WATER:
+            self.ships += 1
+        elif newCode == UNASSIGNED:
+            self.unassigned += 1
+
+
+def isLineCountRespected(array):
+    '''
+    Same check as isLineRespected, in constant time.
+    The parameter should be an array with:
+    [0] = the LineCounter of the line
+    [:] = the row you're checking
+    '''
+    counter = array[0]
+    return counter.ships <= counter.target and (counter.ships + counter.unassigned) >= counter.target
+
+
 def find_boat(grid: List[List[any]], x: int, y: int, visited: set) -> List[Tuple[int, int]]:
     '''
     Finds all parts of a boat starting from (x, y) and ensures it's in one direction.
     '''
+    topo = topology(len(grid), len(grid[0]))
+    cols = topo.cols
     boat = []
     stack = [(x, y)]
     direction = None  # To store the direction of the boat ('horizontal' or 'vertical')
@@ -43,8 +85,9 @@ def find_boat(grid: List[List[any]], x: int, y: int, visited: set) -> List[Tuple
         if (cx, cy) not in visited:
             visited.add((cx, cy))
             boat.append((cx, cy))
-            for nx, ny in get_neighbors(cx, cy, len(grid), len(grid[0])):
-                if grid[ny][nx].state in ['M','<','>','v','^','S'] and (nx, ny) not in visited:
+            for j in topo.orthogonal[cy * cols + cx]:
+                nx, ny = j % cols, j // cols
+                if grid[ny][nx].code > WATER and (nx, ny) not in visited:
                     if direction is None:
                         # Determine initial direction
                         if nx == cx:
@@ -64,28 +107,51 @@ def surroundedByWater(grid: List[List[any]]) -> bool:
     Check if all the boats inside of the grid passed as parameter are surrounded by water.
     '''
     rows, cols = len(grid), len(grid[0])
+    topo = topology(rows, cols)
     visited = set()
 
     for y in range(rows):
         for x in range(cols):
-            if grid[y][x].state in ['M','S','<','>','^','v'] and (x, y) not in visited:
+            if grid[y][x].code > WATER and (x, y) not in visited:
                 # Found a new boat, let's collect its coordinates
                 boat = find_boat(grid, x, y, visited)
+                boatCells = set(bx + by * cols for bx, by in boat)
 
-                # Check surrounding of the boat
-                for bx, by in boat:
-                    for dy in range(-1, 2):
-                        for dx in range (-1, 2):
-                            nx, ny = bx + dx, by + dy
-                            # Skip out-of-bound indices and the boat's own position
-                            if (dx == 0 and dy == 0) or not (0 <= ny < rows and 0 <= nx < cols):
-                                continue
-                            else:
-                                if (grid[ny][nx].state != '.' and grid[ny][nx].state != '0') and (tuple([nx,ny]) not in boat):
-                                    return False                       
+                # Check surrounding of the boat (neighbours within bounds only)
+                for i in boatCells:
+                    for j, __, ___ in topo.around[i]:
+                        if grid[j // cols][j % cols].code > WATER and j not in boatCells:
+                            return False
     return True
 
 
+def surroundedByWaterAt(dataArray) -> bool:
+    '''
+    Incremental version of surroundedByWater, only looking at the 3x3 neighbourhood of one cell.
+    The parameter should be an array with:
+    [0] = the variable that just changed
+    [1] = the cells of the grid, row-major and padded with None (see GridTopology.pad)
+    [2] = the GridTopology of the grid
+    As long as the rest of the grid passes surroundedByWater, both functions give the same result:
+    a new ship segment can only touch another boat diagonally, or bend a boat by having both a horizontal and a vertical neighbour.
+    '''
+    var, cells, topo = dataArray[0], dataArray[1], dataArray[2]
+
+    if var.code <= WATER:                               # Water or unassigned can't make boats touch
+        return True
+
+    i = var.row * topo.cols + var.col
+    for j in topo.diagonal[i]:                          # Diagonals: another boat
+        if cells[j].code > WATER:
+            return False
+
+    left, right, up, down = cells[topo.left[i]], cells[topo.right[i]], cells[topo.up[i]], cells[topo.down[i]]
+    horizontal = (left is not None and left.code > WATER) or (right is not None and right.code > WATER)
+    vertical = (up is not None and up.code > WATER) or (down is not None and down.code > WATER)
+
+    return not (horizontal and vertical)                # Both: the boat isn't straight
+
+
 def get_all_ships(grid: List[List[any]]) -> List[List[Tuple[int, int]]]:
     '''
     Finds all ships in the grid and returns them as a list of boats (each boat is a list of coordinates).
@@ -95,7 +161,7 @@ def get_all_ships(grid: List[List[any]]) -> List[List[Tuple[int, int]]]:
 
     for y in range(len(grid)):
         for x in range(len(grid[0])):
-            if grid[y][x].state in ['M','<','>','^','v','S'] and (x, y) not in visited:
+            if grid[y][x].code > WATER and (x, y) not in visited:
                 # Find a new boat starting from (x, y)
                 boat = find_boat(grid, x, y, visited)
                 ships.append(boat)
@@ -115,111 +181,225 @@ def shipCounter(shipsAndGrid: List[any]):
     '''
     ships, grid, finished_func = shipsAndGrid[0], shipsAndGrid[1], shipsAndGrid[2]
     finished = finished_func()
+    if not finished:                # The fleet can only be checked on a finished grid, no need to look for ships before that
+        return True
     shipList = get_all_ships(grid)
 
-    targetSub, targetDestroyer, targetCruiser, targetBattleship = ships[0], ships[1], ships[2], ships[3]
-    subs, destroyers, cruisers, battleships = 0, 0, 0, 0
-    
+    counts = [0] * len(ships)                   # Number of ships of each length (1 = submarines, 2 = destroyers...)
+
     for ship in shipList:
-        if len(ship) == 1:
-            subs += 1
-        elif len(ship) == 2:
-            destroyers += 1
-        elif len(ship) == 3:
-            cruisers += 1
-        elif len(ship) == 4:
-            battleships += 1
-    
-    if finished == True and (destroyers != targetDestroyer or subs != targetSub or cruisers != targetCruiser or battleships != targetBattleship):
+        if len(ship) > len(ships):              # Longer than any ship of the fleet
+            return False
+        counts[len(ship) - 1] += 1
+
+    if counts != list(ships):
         return False
     else:
         return True
 
 
+class ShipTracker:
+    '''
+    Keeps track of the ships of a grid while it is being filled, with live counts of ships per length.\n
+    Registered as an observer of every variable of the grid. Ship segments are merged with their ship segment neighbours
+    in a union-find (union by size, no path compression), and every merge is logged so that it can be undone
+    when the segment is removed again. Search removes segments in the reverse order they were added,
+    if that ever isn't the case the tracker is rebuilt from the grid.
+    '''
+    def __init__(self, grid: List[List[any]]):
+        rows, cols = len(grid), len(grid[0])
+        self.variables = [var for line in grid for var in line]                 # Row-major cells
+        self.index = {var: i for i, var in enumerate(self.variables)}           # Cell number of each variable
+        self.neighbors = topology(rows, cols).orthogonal                         # Orthogonal neighbours of each cell
+        self.reset()
+
+        for i, var in enumerate(self.variables):                                # Initial ships (hints)
+            if var.code > WATER:
+                self.add(i)
+
+    def reset(self):
+        '''Forgets every ship.'''
+        self.parent = list(range(len(self.variables)))     # Union-find parent of each cell
+        self.size = [1] * len(self.variables)               # Size of the ship, for root cells
+        self.isShip = [False] * len(self.variables)
+        self.counts = {}                                    # Ship length -> number of ships
+        self.history = []                                   # (cell, merges done when adding it), in order of addition
+
+    def find(self, i):
+        while self.parent[i] != i:
+            i = self.parent[i]
+        return i
+
+    def count(self, size, delta):
+        self.counts[size] = self.counts.get(size, 0) + delta
+
+    def add(self, i):
+        '''Adds the ship segment i and merges it with the neighbouring segments.'''
+        self.isShip[i] = True
+        self.count(1, 1)
+        merges = []
+        for n in self.neighbors[i]:
+            if self.isShip[n]:
+                root, other = self.find(i), self.find(n)
+                if root != other:
+                    if self.size[root] < self.size[other]:
+                        root, other = other, root
+                    self.count(self.size[root], -1)
+                    self.count(self.size[other], -1)
+                    self.parent[other] = root
+                    self.size[root] += self.size[other]
+                    self.count(self.size[root], 1)
+                    merges.append((other, root))
+        self.history.append((i, merges))
+
+    def remove(self, i):
+        '''Removes the ship segment i, undoing the merges it caused.'''
+        if not self.history or self.history[-1][0] != i:   # Not the last segment added: rebuild without it
+            self.isShip[i] = False
+            ships = [j for j in range(len(self.variables)) if self.isShip[j]]
+            self.reset()
+            for j in ships:
+                self.add(j)
+            return
+
+        __, merges = self.history.pop()
+        for other, root in reversed(merges):
+            self.count(self.size[root], -1)
+            self.size[root] -= self.size[other]
+            self.parent[other] = other
+            self.count(self.size[root], 1)
+            self.count(self.size[other], 1)
+        self.count(1, -1)
+        self.isShip[i] = False
+
+    def stateChanged(self, var, oldCode, newCode):
+        '''Adds or removes the segment when a cell becomes or stops being a ship segment.'''
+        wasShip = oldCode > WATER
+        isShip = newCode > WATER
+        if isShip and not wasShip:
+            self.add(self.index[var])
+        elif wasShip and not isShip:
+            self.remove(self.index[var])
+
+
+def isFleetRespected(shipsAndTracker: List[any]) -> bool:
+    '''
+    Same check as shipCounter, using the live counts of a ShipTracker.
+    shipsAndTracker is an array with\n
+    rank 0 being an array containing the target value for each ship type\n
+    rank 1 the ShipTracker of the grid\n
+    rank 2 the function stating if the grid is "finished" (= all variables have a state)
+    '''
+    ships, tracker, finished_func = shipsAndTracker[0], shipsAndTracker[1], shipsAndTracker[2]
+    if not finished_func():
+        return True
+
+    for length, target in enumerate(ships, start=1):
+        if tracker.counts.get(length, 0) != target:
+            return False
+    for length, count in tracker.counts.items():
+        if length > len(ships) and count:      # Longer than any ship of the fleet
+            return False
+    return True
+
+
 def stateConstraint(dataArray):
     '''
     Function to represent the constraints on the state of each variable.\n
     Used to check if each tile is surrounded by admissible tiles.\n
-    For instance, a "<" tile can't be followed by another "<" tile.
+    For instance, a "<" tile can't be followed by another "<" tile.\n
+    The parameter should be an array with:
+    [0] = the variable
+    [1] = the cells of the grid, row-major and padded with None (see GridTopology.pad)
+    [2] = the GridTopology of the grid
     '''
-    var = dataArray[0]
-    grid = dataArray[1]
-    __, ___, y, x = var.name.split("_")     # Extract coordinates from variable name. Split on "_". Variables formated as VAR_NAME_ROW_COL
-    x, y = int(x), int(y)               # Turn the row and col values to integers 
-    surrounding = getSurroundingTiles(grid, x, y)
+    var, cells, topo = dataArray[0], dataArray[1], dataArray[2]
+    i = var.row * topo.cols + var.col   # Index of the cell
+    up = cells[topo.up[i]]              # Neighbours, None out of the grid
+    down = cells[topo.down[i]]
+    left = cells[topo.left[i]]
+    right = cells[topo.right[i]]
     
-    if var.state == 'M':
-        if surrounding[1][0]:
-            if surrounding[1][0].state not in ['M', '<']:
+    if var.code == MIDDLE:
+        if left:
+            if left.code not in (MIDDLE, LEFT, UNASSIGNED, WATER):
                 #print("False_1_0")
                 return False
             else:
-                if not surrounding[1][2] and surrounding[1][0].state in ['M','<']:
+                if not right and left.code in (MIDDLE, LEFT):
                     #print("False_1_0_B")
                     return False
         else:
-            if surrounding[0][1] and surrounding[0][1].state == '.':
+            if up and up.code == WATER:
                 return False
 
-        if surrounding[0][1]:
-            if surrounding[0][1].state not in ['M','^','0','.']:
+        if up:
+            if up.code not in (MIDDLE, TOP, UNASSIGNED, WATER):
                 #print("False_0_1")
                 return False
             else:
-                if not surrounding[2][1] and surrounding[0][1].state in ['M','^']:
+                if not down and up.code in (MIDDLE, TOP):
                     #print("False_0_1_B")
                     return False
-        if surrounding[2][1]:
-            if surrounding[2][1].state not in ['M','v', '0', '.']:
+        if down:
+            if down.code not in (MIDDLE, BOTTOM, UNASSIGNED, WATER):
                 #print("False_2_1")
                 return False
             else:
-                if not surrounding[0][1] and surrounding[2][1].state in ['M','v']:
+                if not up and down.code in (MIDDLE, BOTTOM):
                     #print("False_2_1_B")
                     return False
-        if surrounding[1][2]:
-            if surrounding[1][2].state not in ['M', '>', '0', '.']:
+        if right:
+            if right.code not in (MIDDLE, RIGHT, UNASSIGNED, WATER):
                 #print("False_1_2")
                 return False
             else:
-                if not surrounding[1][0] and surrounding[1][2].state in ['M','>']:
+                if not left and right.code in (MIDDLE, RIGHT):
                     #print("False_1_2_B")
                     return False
 
+        # Water (or the border) on a side across an axis means the boat goes along the other axis
+        notHorizontal = topo.border[i] & (LEFT_BORDER | RIGHT_BORDER) or left.code == WATER or right.code == WATER
+        notVertical = topo.border[i] & (TOP_BORDER | BOTTOM_BORDER) or up.code == WATER or down.code == WATER
+        if notHorizontal and notVertical:
+            return False
+        if notHorizontal and ((left and left.code in (MIDDLE, LEFT)) or (right and right.code in (MIDDLE, RIGHT))):
+            return False
+        if notVertical and ((up and up.code in (MIDDLE, TOP)) or (down and down.code in (MIDDLE, BOTTOM))):
+            return False
+
         return True
     
-    elif var.state == 'v':
-        if surrounding[0][1]:
-            if surrounding[0][1].state in ['M', '^', '0']:
-                if surrounding[2][1]:
-                    if surrounding[2][1].state in ['.', '0']:
-                        return True
+    elif var.code == BOTTOM:
+        if up:
+            if up.code in (MIDDLE, TOP, UNASSIGNED):
+                if not down or down.code in (WATER, UNASSIGNED):     # Water or the bottom of the grid below
+                    return True
 
         
-    elif var.state == '^':
-        if surrounding[2][1]:
-            if surrounding[2][1].state in ['M', 'v', '0']:
-                if surrounding[0][1]:
-                    if surrounding[0][1].state in ['.', '0']:
-                        return True
+    elif var.code == TOP:
+        if down:
+            if down.code in (MIDDLE, BOTTOM, UNASSIGNED):
+                if not up or up.code in (WATER, UNASSIGNED):     # Water or the top of the grid above
+                    return True
 
         
-    elif var.state == '>':
-        if surrounding[1][0]:
-            if surrounding[1][0].state in ['M', '<']:
-                if surrounding[1][2]:
-                    if surrounding[1][2].state in ['.','0']:
+    elif var.code == RIGHT:
+        if left:
+            if left.code in (MIDDLE, LEFT, UNASSIGNED):
+                if right:
+                    if right.code in (WATER, UNASSIGNED):
                         return True
                     else:
                         return False
                 else:
                     return True
 
-    elif var.state == '<':
-        if surrounding[1][2]:
-            if surrounding[1][2].state in ['M', '>', '0']:
-                if surrounding[1][0]:
-                    if surrounding[1][0].state in ['.','0']:
+    elif var.code == LEFT:
+        if right:
+            if right.code in (MIDDLE, RIGHT, UNASSIGNED):
+                if left:
+                    if left.code in (WATER, UNASSIGNED):
                         return True
                     else:
                         return False
@@ -231,34 +411,74 @@ def stateConstraint(dataArray):
             return False
 
         
-    elif var.state == 'S':
-        for a in range(3):
-            for b in range(3):
-                if not (a==1 and b==1):
-                    if surrounding[a][b] and surrounding[a][b].state not in ['0','.']:
-                        return False
+    elif var.code == SUBMARINE:
+        for j, __, ___ in topo.around[i]:
+            if cells[j].code not in (UNASSIGNED, WATER):
+                return False
 
         return True
     
-    elif var.state == '.':
-        if surrounding[0][1]:
-            if surrounding[0][1].state in ['^']:
+    elif var.code == WATER:
+        if up:
+            if up.code == TOP:
                 return False
-        if surrounding[2][1]:
-            if surrounding[2][1].state in ['v']:
+        if down:
+            if down.code == BOTTOM:
                 return False
-        if surrounding[1][0]:
-            if surrounding[1][0].state in ['<']:
+        if left:
+            if left.code == LEFT:
                 return False
-        if surrounding[1][2]:
-            if surrounding[1][2].state in ['>']:
+        if right:
+            if right.code == RIGHT:
                 return False
-        if surrounding[1][0] and surrounding[1][0].state in ['M'] and surrounding[0][0] and surrounding[0][0].state in ['.']:
+        if left and left.code == MIDDLE and cells[topo.upLeft[i]] and cells[topo.upLeft[i]].code == WATER:
             return False
-        if surrounding[0][1] and surrounding[0][1].state in ['M'] and surrounding[0][2] and surrounding[0][2].state in ['.']:
+        if up and up.code == MIDDLE and cells[topo.upRight[i]] and cells[topo.upRight[i]].code == WATER:
             return False
         return True     
     else:
         return True
     
-    return False
\ No newline at end of file
+    return False
+
+def compatibleNeighbours(first, second, dx, dy) -> bool:
+    '''
+    Binary projection of the shape and no-touch rules: can a cell in state "first" have a neighbour
+    in state "second" at offset (dx, dy)? Every valid grid respects it for every pair of neighbours,
+    but it's weaker than the full rules (it can't tell a bent boat or a middle segment between two waters).
+    '''
+    ships = ['M','<','>','^','v','S']
+
+    if dx != 0 and dy != 0:                                 # Diagonal: boats can't touch
+        return not (first in ships and second in ships)
+
+    if dx < 0 or dy < 0:                                    # Always look at the pair from left to right / top to bottom
+        first, second, dx, dy = second, first, -dx, -dy
+
+    if dx == 1:                                             # first is on the left of second
+        start, end, alone = '<', '>', ['^','v','S']
+    else:                                                   # first is above second
+        start, end, alone = '^', 'v', ['<','>','S']
+
+    if first == start and second not in ['M', end]:         # A start segment is followed by the rest of its boat
+        return False
+    if second == end and first not in ['M', start]:         # An end segment follows the rest of its boat
+        return False
+    if first in [end] + alone and second in ships:          # Nothing after an end segment, or next to a boat going the other way
+        return False
+    if second in [start] + alone and first in ships:        # Nothing before a start segment, or next to a boat going the other way
+        return False
+    return True
+
+
+def neighbourSupports(dx, dy):
+    '''
+    compatibleNeighbours as bitmasks (see CellStates.py): for each code of a neighbour at offset (dx, dy) of a cell,
+    the mask of the codes the cell can take. A cell's supported codes are the union over its neighbour's possible codes.
+    '''
+    return [maskOf([first for first in SYMBOLS[WATER:] if compatibleNeighbours(first, SYMBOLS[code], dx, dy)]) if code != UNASSIGNED else 0
+            for code in range(len(SYMBOLS))]
+
+
+# neighbourSupports of every offset, built once
+NEIGHBOUR_SUPPORTS = {(dx, dy): neighbourSupports(dx, dy) for dy in range(-1, 2) for dx in range(-1, 2) if (dx, dy) != (0, 0)}
@@ -1,5 +1,57 @@
+from functools import lru_cache
 from typing import List, Tuple
 
+OUTSIDE = -1                                            # Index of the neighbours out of the grid, see GridTopology
+TOP_BORDER, BOTTOM_BORDER, LEFT_BORDER, RIGHT_BORDER = 1, 2, 4, 8
+
+
+class GridTopology:
+    '''
+    Neighbourhood tables of a rows x cols grid, cells being numbered row-major (i = row * cols + col).
+    Built once per grid size, see topology. For each cell i:\n
+        - up[i], down[i], left[i], right[i], upLeft[i], upRight[i], downLeft[i], downRight[i]: index of that neighbour, OUTSIDE if out of the grid,
+        - orthogonal[i]: indices of the orthogonal neighbours in the grid, in get_neighbors order (left, right, up, down),
+        - diagonal[i]: indices of the diagonal neighbours in the grid,
+        - around[i]: (index, dx, dy) of the neighbours in the grid, row-major,
+        - border[i]: the borders of the grid the cell is on (TOP_BORDER | LEFT_BORDER...).\n
+    A row-major list of cells padded with a trailing None (see pad) reads None for OUTSIDE, like getSurroundingTiles.
+    '''
+
+    def __init__(self, rows: int, cols: int):
+        self.rows, self.cols = rows, cols
+        size = rows * cols
+
+        def neighbour(i, dx, dy):
+            x, y = i % cols + dx, i // cols + dy
+            return y * cols + x if 0 <= x < cols and 0 <= y < rows else OUTSIDE
+
+        self.up = [neighbour(i, 0, -1) for i in range(size)]
+        self.down = [neighbour(i, 0, 1) for i in range(size)]
+        self.left = [neighbour(i, -1, 0) for i in range(size)]
+        self.right = [neighbour(i, 1, 0) for i in range(size)]
+        self.upLeft = [neighbour(i, -1, -1) for i in range(size)]
+        self.upRight = [neighbour(i, 1, -1) for i in range(size)]
+        self.downLeft = [neighbour(i, -1, 1) for i in range(size)]
+        self.downRight = [neighbour(i, 1, 1) for i in range(size)]
+
+        self.orthogonal = [tuple(j for j in (self.left[i], self.right[i], self.up[i], self.down[i]) if j != OUTSIDE) for i in range(size)]
+        self.diagonal = [tuple(j for j in (self.upLeft[i], self.upRight[i], self.downLeft[i], self.downRight[i]) if j != OUTSIDE) for i in range(size)]
+        self.around = [tuple((neighbour(i, dx, dy), dx, dy) for dy in range(-1, 2) for dx in range(-1, 2)
+                             if (dx, dy) != (0, 0) and neighbour(i, dx, dy) != OUTSIDE) for i in range(size)]
+        self.border = [(TOP_BORDER if i < cols else 0) | (BOTTOM_BORDER if i >= size - cols else 0) |
+                       (LEFT_BORDER if i % cols == 0 else 0) | (RIGHT_BORDER if i % cols == cols - 1 else 0) for i in range(size)]
+
+    def pad(self, grid: List[List[any]]) -> List[any]:
+        '''Row-major list of the cells of grid, followed by None (the value read for OUTSIDE).'''
+        return [cell for line in grid for cell in line] + [None]
+
+
+@lru_cache(maxsize=None)
+def topology(rows: int, cols: int) -> GridTopology:
+    '''The GridTopology of a rows x cols grid, shared by every grid of that size.'''
+    return GridTopology(rows, cols)
+
+
 def printGrid(grid: List[List[any]]):
     '''
     Simply prints a matrix passed as a parameter.
@@ -46,18 +98,16 @@ def getSurroundingTiles(matrix: List[List[any]], x: int, y: int) -> List[List[an
     '''
     Given a 2D matrix and coordinates (x, y), return a 3x3 matrix representing
     the tile at (x, y) and its surrounding tiles. Tiles outside the matrix bounds are None.
+    Allocates the 3x3 matrix: the hot loops read the neighbours through topology instead.
     '''
     rows, cols = len(matrix), len(matrix[0])
     
     # Initialize 3x3 surrounding tiles with None
     surroundingTiles = [[None for _ in range(3)] for _ in range(3)]
+    surroundingTiles[1][1] = matrix[y][x]
 
-    # Iterate through the 3x3 grid centered around (x, y)
-    for dy in range(-1, 2):
-        for dx in range(-1, 2):
-            nx, ny = x + dx, y + dy  # Calculate the neighbor's coordinates
-            if 0 <= nx < cols and 0 <= ny < rows:  # Check if within bounds
-                surroundingTiles[dy + 1][dx + 1] = matrix[ny][nx]
+    for j, dx, dy in topology(rows, cols).around[y * cols + x]:    # Neighbours within bounds
+        surroundingTiles[dy + 1][dx + 1] = matrix[j // cols][j % cols]
     
     return surroundingTiles
 
@@ -65,12 +115,40 @@ def getSurroundingTiles(matrix: List[List[any]], x: int, y: int) -> List[List[an
 
 def get_neighbors(x: int, y: int, rows: int, cols: int) -> List[Tuple[int, int]]:
     '''
-    Returns the valid neighbors of a cell (x, y) in a grid.
+    Returns the valid neighbors of a cell (x, y) in a grid: left, right, up, down.
     '''
-    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # up, down, left, right
-    neighbors = []
-    for dx, dy in directions:
-        nx, ny = x + dx, y + dy
-        if 0 <= nx < cols and 0 <= ny < rows:
-            neighbors.append((nx, ny))
-    return neighbors
\ No newline at end of file
+    return [(j % cols, j // cols) for j in topology(rows, cols).orthogonal[y * cols + x]]
+
+
+def drawShips(grid: List[List[str]]) -> List[List[str]]:
+    rows, cols = len(grid), len(grid[0])
+    topo = topology(rows, cols)
+    cells = topo.pad(grid)
+    symbols = []
+
+    for i in range(rows * cols):
+        if cells[i] == 'M':  # Found a ship cell
+            # Determine ship type based on surrounding tiles
+            above = cells[topo.up[i]]
+            below = cells[topo.down[i]]
+            left = cells[topo.left[i]]
+            right = cells[topo.right[i]]
+
+            if above == 'M' and below == 'M':
+                symbols.append('M')  # Part of vertical ship
+            elif left == 'M' and right == 'M':
+                symbols.append('M')  # Part of horizontal ship
+            elif above == 'M':
+                symbols.append('v')
+            elif below == 'M':
+                symbols.append('^')
+            elif left == 'M':
+                symbols.append('>')
+            elif right == 'M':
+                symbols.append('<')
+            else:
+                symbols.append('S')  # Single tile ship
+        else:
+            symbols.append('.')
+
+    return [symbols[y * cols:(y + 1) * cols] for y in range(rows)]
@@ -0,0 +1,77 @@
+import json
+import time
+
+
+class SolverStats:
+    '''
+    Measures collected while a BattleShipProblem is instrumented (see BattleShipProblem.instrument):
+        - per constraint type (ROW, COL, PROX, SHIPS, TypeOf): number of checks, cumulative time, failed checks,
+        - per search depth (number of cells assigned by the search): domain values pruned and backtracks.
+    '''
+
+    def __init__(self):
+        self.constraints = {}       # Constraint type -> {"calls", "time", "failures"}
+        self.prunings = {}          # Depth -> domain values removed
+        self.backtracks = {}        # Depth -> variables unassigned by a backtrack
+
+
+    def wrap(self, cons):
+        '''Returns the function of cons wrapped to record its checks under the constraint type (name without the CONS_ prefix and the indices).'''
+        function = cons.function
+        entry = self.constraints.setdefault(cons.name.split("_")[1], {"calls": 0, "time": 0.0, "failures": 0})
+
+        def timed(scope):
+            start = time.perf_counter()
+            result = function(scope)
+            entry["time"] += time.perf_counter() - start
+            entry["calls"] += 1
+            if result == False:
+                entry["failures"] += 1
+            return result
+
+        timed.wrapped = function    # To put the original function back
+        return timed
+
+
+    def pruned(self, depth, count):
+        self.prunings[depth] = self.prunings.get(depth, 0) + count
+
+
+    def backtracked(self, depth):
+        self.backtracks[depth] = self.backtracks.get(depth, 0) + 1
+
+
+    def checks(self):
+        '''Total number of constraint checks.'''
+        return sum(entry["calls"] for entry in self.constraints.values())
+
+
+    def toDict(self):
+        '''The measures as plain data. The per depth measures are lists indexed by depth.'''
+        perDepth = lambda counts: [counts.get(depth, 0) for depth in range(max(counts) + 1)] if counts else []
+        return {
+            "constraints": {name: dict(entry) for name, entry in sorted(self.constraints.items())},
+            "prunings": perDepth(self.prunings),
+            "backtracks": perDepth(self.backtracks),
+            "totalPrunings": sum(self.prunings.values()),
+            "totalBacktracks": sum(self.backtracks.values()),
+            "totalChecks": self.checks(),
+        }
+
+
+    def toJSON(self, **options):
+        return json.dumps(self.toDict(), **options)
+
+
+    def dump(self, file_path):
+        '''Writes the measures to a JSON file.'''
+        with open(file_path, 'w') as file:
+            json.dump(self.toDict(), file, indent=1)
+
+
+    def __str__(self):
+        lines = ["{:>8} | {:>10} | {:>10} | {:>10}".format("Type", "Calls", "Time (s)", "Failures")]
+        for name, entry in sorted(self.constraints.items()):
+            lines.append("{:>8} | {:>10} | {:>10.4f} | {:>10}".format(name, entry["calls"], entry["time"], entry["failures"]))
+        lines.append("Prunings: {}, backtracks: {}".format(sum(self.prunings.values()), sum(self.backtracks.values())))
+        return "\n".join(lines)
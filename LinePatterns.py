@@ -0,0 +1,188 @@
+from functools import lru_cache
+from typing import List
+
+from GridSystem import drawShips
+
+# Symbols of the ship segments, along a row and along a column:
+# (start of a ship of 2+ cells, its middle, its end, the possible symbols of a 1 cell run: a submarine or a ship crossing the line)
+AXIS_SYMBOLS = {
+    "row": ('<', 'M', '>', ['S', '^', 'v', 'M']),
+    "col": ('^', 'M', 'v', ['S', '<', '>', 'M']),
+}
+
+
+@lru_cache(maxsize=8192)
+def linePatterns(length, target, hints, maxShip, axis):
+    '''
+    Every valid pattern of a line of length cells holding target ship segments, as a tuple of occupancy masks (bit i = cell i).
+    hints is the tuple of the line's symbols ('0' for no hint), maxShip the longest ship of the fleet, axis "row" or "col".
+    Runs of ship cells are at most maxShip long, and their ends and middles match the hints (see AXIS_SYMBOLS).\n
+    A line only depends on these arguments, so the patterns are cached and shared by every puzzle of a batch.
+    '''
+    start, middle, end, single = AXIS_SYMBOLS[axis]
+    patterns = []
+
+    def fits(position, run):
+        '''Checks the hints of a run of ship cells starting at position.'''
+        if run == 1:
+            return hints[position] in ['0'] + single
+        symbols = [start] + [middle] * (run - 2) + [end]
+        return all(hints[position + i] in ['0', symbol] for i, symbol in enumerate(symbols))
+
+    def extend(position, left, mask):
+        if left > length - position:                            # Not enough cells left
+            return
+        if position >= length:
+            patterns.append(mask)
+            return
+
+        if hints[position] in ['0', '.']:                       # Water here
+            extend(position + 1, left, mask)
+
+        if hints[position] != '.':                              # A run of ship cells starts here, followed by water
+            for run in range(1, min(maxShip, left, length - position) + 1):
+                if hints[position + run - 1] == '.':
+                    break
+                if position + run < length and hints[position + run] not in ['0', '.']:
+                    continue                                    # The cell after the run must be water
+                if fits(position, run):
+                    runMask = ((1 << run) - 1) << position
+                    extend(min(position + run + 1, length), left - run, mask | runMask)
+
+    extend(0, target, 0)
+    return tuple(patterns)
+
+
+def runLengths(mask, length):
+    '''Lengths of the runs of 2+ ship cells in a line pattern.'''
+    lengths, run = [], 0
+    for i in range(length + 1):
+        if i < length and mask >> i & 1:
+            run += 1
+        else:
+            if run > 1:
+                lengths.append(run)
+            run = 0
+    return lengths
+
+
+class LinePatternSolver:
+    '''
+    Solves a puzzle line by line: each row and column takes one of its cached patterns (see linePatterns),
+    instead of each cell taking a symbol. Choosing a row pattern fixes one bit of every column, which filters the
+    column pattern domains. The rows left are filtered by the column domains and by the no-touch rule with the rows
+    chosen next to them, and the row with the fewest patterns is chosen next. Ship symbols are derived with drawShips.
+    '''
+
+    def __init__(self, grid: List[List[str]], rowTargets: List[int], colTargets: List[int], ships: List[int]):
+        self.rows, self.cols = len(grid), len(grid[0])
+        self.grid = [list(line) for line in grid]
+        self.rowTargets = list(rowTargets)
+        self.colTargets = list(colTargets)
+        self.ships = list(ships)
+        self.steps = 0
+        self.full = (1 << self.cols) - 1
+
+        maxShip = len(ships)
+        self.rowDomains = [linePatterns(self.cols, self.rowTargets[r], tuple(self.grid[r]), maxShip, "row") for r in range(self.rows)]
+        self.colDomains = [list(linePatterns(self.rows, self.colTargets[c], tuple(line[c] for line in self.grid), maxShip, "col"))
+                           for c in range(self.cols)]
+
+        # Ships of 2+ cells of each row pattern, per length (vertical ships are only known once every row is chosen)
+        self.rowRuns = {}
+        for r in range(self.rows):
+            for mask in self.rowDomains[r]:
+                self.rowRuns[mask] = runLengths(mask, self.cols)
+
+
+    def allowedRows(self, r, chosen, colDomains):
+        '''Patterns of row r compatible with the column domains and with the chosen rows above and below it.'''
+        ones, zeros = 0, 0                                      # Columns where row r can be a ship / water
+        for c, domain in enumerate(colDomains):
+            bits = {mask >> r & 1 for mask in domain}
+            if 1 in bits:
+                ones |= 1 << c
+            if 0 in bits:
+                zeros |= 1 << c
+        mustShip = ones & ~zeros
+        mustWater = zeros & ~ones
+
+        touching = 0                                            # Cells on a diagonal of a ship segment of a chosen neighbour row
+        for neighbour in [r - 1, r + 1]:
+            if neighbour in chosen:
+                touching |= ((chosen[neighbour] << 1) | (chosen[neighbour] >> 1)) & self.full
+
+        return [mask for mask in self.rowDomains[r] if mask & mustShip == mustShip and not mask & (mustWater | touching)]
+
+
+    def solve(self):
+        '''Returns the solution grid (list of rows of symbols) or None.'''
+        if sum(self.rowTargets) != sum(self.colTargets):
+            return None
+        fleet = [length for length in range(1, len(self.ships) + 1) for _ in range(self.ships[length - 1])]
+        if sum(fleet) != sum(self.rowTargets):
+            return None
+        return self.search({}, self.colDomains, [0] * (len(self.ships) + 1))
+
+
+    def search(self, chosen, colDomains, horizontal):
+        '''chosen maps the rows chosen so far to their pattern, horizontal counts their ships of 2+ cells per length.'''
+        self.steps += 1
+
+        if len(chosen) == self.rows:
+            return self.complete(chosen)
+
+        # Row with the fewest patterns left
+        best, bestRows = None, None
+        for r in range(self.rows):
+            if r not in chosen:
+                allowed = self.allowedRows(r, chosen, colDomains)
+                if bestRows is None or len(allowed) < len(bestRows):
+                    best, bestRows = r, allowed
+                    if not allowed:
+                        return None
+
+        for mask in bestRows:
+            runs = self.rowRuns[mask]
+            for length in runs:
+                horizontal[length] += 1
+            if all(horizontal[length] <= self.ships[length - 1] for length in runs):
+                newDomains = [[pattern for pattern in domain if (pattern >> best & 1) == (mask >> c & 1)]
+                              for c, domain in enumerate(colDomains)]
+                if all(newDomains):
+                    chosen[best] = mask
+                    result = self.search(chosen, newDomains, horizontal)
+                    if result is not None:
+                        return result
+                    del chosen[best]
+            for length in runs:
+                horizontal[length] -= 1
+
+        return None
+
+
+    def complete(self, chosen):
+        '''Derives the symbols of a full occupancy grid and checks them against the hints and the fleet.'''
+        grid = drawShips([['M' if chosen[r] >> c & 1 else '.' for c in range(self.cols)] for r in range(self.rows)])
+
+        for r in range(self.rows):
+            for c in range(self.cols):
+                if self.grid[r][c] not in ['0', grid[r][c]]:
+                    return None
+
+        counts = [0] * len(self.ships)
+        for r in range(self.rows):
+            for c in range(self.cols):
+                symbol = grid[r][c]
+                if symbol in ['S', '<', '^']:                   # One count per ship, at its first cell
+                    length = 1
+                    step = (0, 1) if symbol == '<' else (1, 0)
+                    while symbol != 'S' and grid[r + step[0] * length][c + step[1] * length] == 'M':
+                        length += 1
+                    length += 0 if symbol == 'S' else 1         # The end segment
+                    if length > len(counts):
+                        return None
+                    counts[length - 1] += 1
+        if counts != self.ships:
+            return None
+        return grid
@@ -1,40 +1,65 @@
+import io
+import multiprocessing
+import os
+from functools import lru_cache
+
 from PIL import Image, ImageDraw, ImageFont
 
 icons_paths = {
     'S': 'Images/Assets/single_tile_ship_icon.png',
-    '<': 'Images/Assets/left_arrow_icon.png',       
-    '>': 'Images/Assets/right_arrow_icon.png',      
-    'M': 'Images/Assets/center_part_icon.png',      
-    '^': 'Images/Assets/up_arrow_icon.png',         
+    '<': 'Images/Assets/left_arrow_icon.png',
+    '>': 'Images/Assets/right_arrow_icon.png',
+    'M': 'Images/Assets/center_part_icon.png',
+    '^': 'Images/Assets/up_arrow_icon.png',
     'v': 'Images/Assets/down_arrow_icon.png',
-    '.': 'Images/Assets/water_icon.png'     
+    '.': 'Images/Assets/water_icon.png'
 }
 
-def draw_battleship_grid(grid, icon_paths = icons_paths, filename = "output.png"):
-    
-    cell_size = 64                              # Define the size of a cell
-    grid_width = len(grid[0]) * cell_size       # Getting the grid width
-    grid_height = len(grid) * cell_size         # and height
-    
-    # Create a new blank image with white background
-    img = Image.new('RGB', (grid_width, grid_height), color="white")
-    draw = ImageDraw.Draw(img)
+OUTPUT_DIR = "Images/Assets/Outputs/"
+
+
+def icon_atlas(cell_size = 64, icon_paths = icons_paths):
+    '''
+    Icons resized to cell_size, by symbol. Loaded once per cell size and icon set, then kept in memory:
+    rendering many grids only pastes them.
+    '''
+    return load_icons(cell_size, tuple(sorted(icon_paths.items())))
 
-    # Load and resize icons based on the cell size. Icons are custom made on another software (photoshop) and then imported to the project file as .png
+
+@lru_cache(maxsize=None)
+def load_icons(cell_size, icon_items):
+    '''Loads and resizes the icons of icon_items ((symbol, path) pairs). Cached, see icon_atlas.'''
+    # Icons are custom made on another software (photoshop) and then imported to the project file as .png
     icons = {}
-    for key, path in icon_paths.items():
+    for key, path in icon_items:
         try:
             icon = Image.open(path)
             icons[key] = icon.resize((cell_size, cell_size))        # We resize the png to match the size of a cell
         except FileNotFoundError:
             print(f"Warning: Icon for '{key}' not found at {path}, using text instead.")
-    
-    # Load a font for drawing text (used if the icon isn't loaded correctly)
+    return icons
+
+
+@lru_cache(maxsize=None)
+def load_font(size = 30):
+    '''Font for drawing text (used if the icon isn't loaded correctly), loaded once per size.'''
     try:
-        font = ImageFont.truetype("arial.ttf", 30)
+        return ImageFont.truetype("arial.ttf", size)
     except IOError:
-        font = ImageFont.load_default()
+        return ImageFont.load_default()
+
 
+def render_grid(grid, cell_size = 64, icon_paths = icons_paths):
+    '''Draws a grid of symbols with the cached icons (see icon_atlas) and returns the image, without saving it.'''
+    grid_width = len(grid[0]) * cell_size       # Getting the grid width
+    grid_height = len(grid) * cell_size         # and height
+
+    # Create a new blank image with white background
+    img = Image.new('RGB', (grid_width, grid_height), color="white")
+    draw = ImageDraw.Draw(img)
+
+    icons = icon_atlas(cell_size, icon_paths)
+    font = load_font()
 
     # Draw the grid and its contents
     for row in range(len(grid)):
@@ -62,5 +87,69 @@ def draw_battleship_grid(grid, icon_paths = icons_paths, filename = "output.png"
                 text_y = y0 + (cell_size - text_height) / 2
                 draw.text((text_x, text_y), text, fill="black", font=font)
 
-    img.save("Images/Assets/Outputs/" + filename)
-    return img
\ No newline at end of file
+    return img
+
+
+def png_bytes(img):
+    '''The image encoded as PNG, in memory.'''
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def draw_battleship_grid(grid, icon_paths = icons_paths, filename = "output.png", output_dir = OUTPUT_DIR, cell_size = 64):
+    '''Draws a grid (see render_grid) and saves it as output_dir + filename. With output_dir = None, nothing is written.'''
+    img = render_grid(grid, cell_size, icon_paths)
+    if output_dir is not None:
+        img.save(os.path.join(output_dir, filename))
+    return img
+
+
+def render_sprite_sheet(grids, columns = None, cell_size = 64, spacing = 16, icon_paths = icons_paths):
+    '''
+    Draws many grids into a single image, in rows of columns grids (a square layout by default),
+    each one in a slot the size of the largest grid, with spacing pixels between the slots. Returns the image.
+    '''
+    if not grids:
+        raise ValueError("No grid to draw")
+    columns = columns or max(1, int(len(grids) ** 0.5 + 0.999))
+    slot_width = max(len(grid[0]) for grid in grids) * cell_size + spacing
+    slot_height = max(len(grid) for grid in grids) * cell_size + spacing
+    rows = (len(grids) + columns - 1) // columns
+
+    sheet = Image.new('RGB', (columns * slot_width - spacing, rows * slot_height - spacing), color="white")
+    for i, grid in enumerate(grids):
+        sheet.paste(render_grid(grid, cell_size, icon_paths), ((i % columns) * slot_width, (i // columns) * slot_height))
+    return sheet
+
+
+def render_job(job):
+    '''
+    Worker of render_batch: draws one grid. job is (index, grid, cell_size, icon_paths, path).
+    Returns (index, path) once saved to path, or (index, PNG bytes) if path is None.
+    '''
+    index, grid, cell_size, icon_paths, path = job
+    img = render_grid(grid, cell_size, icon_paths)
+    if path is None:
+        return index, png_bytes(img)
+    img.save(path)
+    return index, path
+
+
+def render_batch(grids, output_dir = None, prefix = "grid", cell_size = 64, workers = None, chunksize = 8, icon_paths = icons_paths):
+    '''
+    Draws many grids over a pool of worker processes (os.cpu_count() by default). Each worker loads the icons once.\n
+    With output_dir, grid i is saved as output_dir/prefix_i.png and the paths are returned.
+    Without it, nothing is written: the PNG bytes of each grid are returned. Results are in the order of grids.
+    '''
+    paths = [None] * len(grids)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        paths = [os.path.join(output_dir, "{}_{}.png".format(prefix, i)) for i in range(len(grids))]
+    jobs = [(i, grid, cell_size, icon_paths, path) for i, (grid, path) in enumerate(zip(grids, paths))]
+
+    results = [None] * len(grids)
+    with multiprocessing.Pool(processes=workers) as pool:
+        for index, result in pool.imap_unordered(render_job, jobs, chunksize=chunksize):
+            results[index] = result
+    return results
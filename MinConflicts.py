@@ -0,0 +1,354 @@
+import random
+from typing import List
+
+from GridSystem import drawShips
+
+
+class MinConflictsSolver:
+    '''
+    Min-conflicts local search over complete grids.\n
+    Each free cell holds ship or water. The symbols are derived like drawShips does, so a grid can't have a badly
+    shaped boat, only boats that touch. Hinted cells keep their value. The conflicts of a grid are:
+        - the distance of each row and column count to its target,
+        - the pairs of ship segments touching diagonally (boats touching, or bent),
+        - the hinted ship segments whose derived symbol isn't the hint (i.e. a "<" hint without a segment on its right),
+        - the distance of the number of ships of each length to the fleet.
+    They are kept as running tallies (per row, per column, per cell neighbourhood): evaluating or making a move
+    only recomputes the neighbourhood, the row and the column of the changed cell.
+    '''
+
+    def __init__(self, grid: List[List[str]], rowTargets: List[int], colTargets: List[int], ships: List[int], seed=None):
+        self.rows, self.cols = len(grid), len(grid[0])
+        self.rowTargets = list(rowTargets)
+        self.colTargets = list(colTargets)
+        self.ships = list(ships)
+        self.random = random.Random(seed)
+        self.steps = 0
+        self.restarts = 0
+
+        cells = self.rows * self.cols
+        self.hints = [grid[i // self.cols][i % self.cols] for i in range(cells)]
+        self.free = [i for i in range(cells) if self.hints[i] not in ['.', 'M', '<', '>', '^', 'v', 'S']]
+        self.hinted = [i for i in range(cells) if self.hints[i] in ['M', '<', '>', '^', 'v', 'S']]
+
+        # Orthogonal neighbours as (cell, direction), and diagonal neighbours, of every cell
+        self.orthogonal = []
+        self.diagonal = []
+        for i in range(cells):
+            r, c = divmod(i, self.cols)
+            self.orthogonal.append([((r + dy) * self.cols + c + dx, (dx, dy)) for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]
+                                    if 0 <= r + dy < self.rows and 0 <= c + dx < self.cols])
+            self.diagonal.append([(r + dy) * self.cols + c + dx for dx in [-1, 1] for dy in [-1, 1]
+                                  if 0 <= r + dy < self.rows and 0 <= c + dx < self.cols])
+
+        # Cells of every position of a ship of each length lying on free cells only, for the ship moves
+        free = set(self.free)
+        self.placements = {}
+        for length in range(1, len(self.ships) + 1):
+            self.placements[length] = []
+            for i in self.free:
+                r, c = divmod(i, self.cols)
+                for dx, dy in ([(1, 0), (0, 1)] if length > 1 else [(1, 0)]):
+                    if r + dy * (length - 1) < self.rows and c + dx * (length - 1) < self.cols:
+                        cells = [(r + dy * k) * self.cols + c + dx * k for k in range(length)]
+                        if all(j in free for j in cells):
+                            self.placements[length].append(cells)
+
+
+    # ----- Tallies -----
+
+    def symbol(self, i):
+        '''Symbol of cell i, derived from its orthogonal neighbours (same rules as drawShips).'''
+        if not self.ship[i]:
+            return '.'
+        around = {direction for j, direction in self.orthogonal[i] if self.ship[j]}
+        if {(0, -1), (0, 1)} <= around or {(-1, 0), (1, 0)} <= around:
+            return 'M'
+        for direction, symbol in [((0, -1), 'v'), ((0, 1), '^'), ((-1, 0), '>'), ((1, 0), '<')]:
+            if direction in around:
+                return symbol
+        return 'S'
+
+    def isolated(self, i):
+        '''1 if cell i is a ship segment without orthogonal neighbour (a submarine).'''
+        return int(self.ship[i] and not any(self.ship[j] for j, __ in self.orthogonal[i]))
+
+    def touching(self, i):
+        '''Number of diagonal ship neighbours of cell i, if it's a ship segment.'''
+        return sum(1 for j in self.diagonal[i] if self.ship[j]) if self.ship[i] else 0
+
+    def mismatch(self, i):
+        '''1 if cell i is a hinted ship segment whose derived symbol isn't the hint.'''
+        return int(self.hints[i] in ['M', '<', '>', '^', 'v', 'S'] and self.symbol(i) != self.hints[i])
+
+    def runs(self, cells):
+        '''Lengths of the runs of at least 2 ship segments along cells (a row or a column).'''
+        lengths, length = [], 0
+        for i in cells + [None]:
+            if i is not None and self.ship[i]:
+                length += 1
+            else:
+                if length > 1:
+                    lengths.append(length)
+                length = 0
+        return lengths
+
+    def rowCells(self, r):
+        return list(range(r * self.cols, (r + 1) * self.cols))
+
+    def colCells(self, c):
+        return list(range(c, self.rows * self.cols, self.cols))
+
+    def fleetCost(self, fleet):
+        '''Distance between the number of ships of each length and the fleet.'''
+        cost = sum(abs(fleet.get(length, 0) - target) for length, target in enumerate(self.ships, start=1))
+        return cost + sum(count for length, count in fleet.items() if length > len(self.ships))
+
+    def around(self, i):
+        '''Cells whose local tallies depend on cell i: itself and its orthogonal and diagonal neighbours.'''
+        return [i] + [j for j, __ in self.orthogonal[i]] + self.diagonal[i]
+
+    def conflictedCell(self, i):
+        '''A free cell is conflicted if it touches a boat diagonally, is next to a mismatched hint, or sits in a row or column off its target.'''
+        r, c = divmod(i, self.cols)
+        return (self.touching(i) > 0 or any(self.mismatch(j) for j, __ in self.orthogonal[i])
+                or self.rowCount[r] != self.rowTargets[r] or self.colCount[c] != self.colTargets[c])
+
+    def rebuild(self):
+        '''Computes every tally from the current grid.'''
+        self.rowCount = [sum(self.ship[i] for i in self.rowCells(r)) for r in range(self.rows)]
+        self.colCount = [sum(self.ship[i] for i in self.colCells(c)) for c in range(self.cols)]
+        self.rowRuns = [self.runs(self.rowCells(r)) for r in range(self.rows)]
+        self.colRuns = [self.runs(self.colCells(c)) for c in range(self.cols)]
+        self.fleet = {1: sum(self.isolated(i) for i in range(len(self.ship)))}
+        for lengths in self.rowRuns + self.colRuns:
+            for length in lengths:
+                self.fleet[length] = self.fleet.get(length, 0) + 1
+
+        self.contacts = sum(self.touching(i) for i in range(len(self.ship)))      # Twice the number of diagonal contacts
+        self.mismatches = sum(self.mismatch(i) for i in self.hinted)
+        self.lines = (sum(abs(count - target) for count, target in zip(self.rowCount, self.rowTargets))
+                      + sum(abs(count - target) for count, target in zip(self.colCount, self.colTargets)))
+        self.conflicted = set(i for i in self.free if self.conflictedCell(i))
+
+    def cost(self):
+        return self.contacts // 2 + self.mismatches + self.lines + self.fleetCost(self.fleet)
+
+
+    # ----- Moves -----
+
+    def flip(self, i):
+        '''
+        Flips cell i (ship <-> water) and updates the tallies.
+        Returns the state needed by unflip to put the tallies back.
+        '''
+        r, c = divmod(i, self.cols)
+        saved = (self.contacts, self.mismatches, self.lines, self.fleet, self.rowRuns[r], self.colRuns[c])
+        neighbourhood = [i] + [j for j, __ in self.orthogonal[i]]
+
+        self.contacts -= self.localContacts(i)
+        self.mismatches -= sum(self.mismatch(j) for j in neighbourhood)
+        subs = sum(self.isolated(j) for j in neighbourhood)
+        self.fleet = dict(self.fleet)
+        for length in self.rowRuns[r] + self.colRuns[c]:
+            self.fleet[length] -= 1
+
+        self.ship[i] = not self.ship[i]
+        delta = 1 if self.ship[i] else -1
+
+        self.contacts += self.localContacts(i)
+        self.mismatches += sum(self.mismatch(j) for j in neighbourhood)
+        self.fleet[1] += sum(self.isolated(j) for j in neighbourhood) - subs
+        self.rowRuns[r] = self.runs(self.rowCells(r))
+        self.colRuns[c] = self.runs(self.colCells(c))
+        for length in self.rowRuns[r] + self.colRuns[c]:
+            self.fleet[length] = self.fleet.get(length, 0) + 1
+
+        self.lines -= abs(self.rowCount[r] - self.rowTargets[r]) + abs(self.colCount[c] - self.colTargets[c])
+        self.rowCount[r] += delta
+        self.colCount[c] += delta
+        self.lines += abs(self.rowCount[r] - self.rowTargets[r]) + abs(self.colCount[c] - self.colTargets[c])
+        return saved
+
+    def unflip(self, i, saved):
+        '''Puts cell i and the tallies back as they were before flip(i).'''
+        r, c = divmod(i, self.cols)
+        self.ship[i] = not self.ship[i]
+        delta = 1 if self.ship[i] else -1
+        self.rowCount[r] += delta
+        self.colCount[c] += delta
+        self.contacts, self.mismatches, self.lines, self.fleet, self.rowRuns[r], self.colRuns[c] = saved
+
+    def localContacts(self, i):
+        '''Diagonal contacts involving cell i, counted from both ends like self.contacts.'''
+        return 2 * self.touching(i)
+
+    def updateConflicted(self, i):
+        '''Refreshes the conflicted status of the cells a flip of cell i can affect.'''
+        r, c = divmod(i, self.cols)
+        cells = set(self.rowCells(r) + self.colCells(c))
+        for j in self.around(i):
+            cells.update(k for k, __ in self.orthogonal[j])
+            cells.update(self.diagonal[j])
+        for j in cells:
+            if self.hints[j] != '0':
+                continue
+            if self.conflictedCell(j):
+                self.conflicted.add(j)
+            else:
+                self.conflicted.discard(j)
+
+
+    # ----- Search -----
+
+    def flipAll(self, cells):
+        '''Flips every cell of cells (see flip). Returns the states needed by unflipAll.'''
+        return [(i, self.flip(i)) for i in cells]
+
+    def unflipAll(self, saved):
+        '''Undoes flipAll, last flip first.'''
+        for i, state in reversed(saved):
+            self.unflip(i, state)
+
+    def runOf(self, i):
+        '''Cells of the ship through ship cell i: along its row if it has a ship neighbour there, else along its column.'''
+        r, c = divmod(i, self.cols)
+        horizontal = (c > 0 and self.ship[i - 1]) or (c + 1 < self.cols and self.ship[i + 1])
+        line, k = (self.rowCells(r), c) if horizontal else (self.colCells(c), r)
+        start, end = k, k
+        while start > 0 and self.ship[line[start - 1]]:
+            start -= 1
+        while end + 1 < len(line) and self.ship[line[end + 1]]:
+            end += 1
+        return line[start:end + 1]
+
+    def shipMove(self, i, samples):
+        '''
+        Move of a whole ship, which single flips can't do without going through worse grids:
+            - ship cell i of a ship lying on free cells only: the ship moves to the best of its translations keeping
+              its rows or its columns, and of "samples" random positions of its length (see self.placements),
+            - otherwise: cell i is swapped with a free cell of the other value in its row or column, which keeps the
+              count of that line.
+        Returns the cells to flip, and their cost once flipped, or (None, None) if no move was found.
+        '''
+        moves = []
+        run = self.runOf(i) if self.ship[i] else None
+        if run is not None and len(run) <= len(self.ships) and all(self.hints[j] == '0' for j in run):
+            inRun = set(run)
+            targets = self.placements[len(run)]
+            rows = {j // self.cols for j in run}
+            cols = {j % self.cols for j in run}
+            horizontal = len(rows) == 1 and len(run) > 1
+            # Translations keeping its rows or its columns, and a few random positions
+            shifted = [target for target in targets if (len(run) == 1 or (target[1] - target[0] == 1) == horizontal)
+                       and ({j // self.cols for j in target} == rows or {j % self.cols for j in target} == cols)]
+            for target in shifted + [self.random.choice(targets) for __ in range(samples)]:
+                if all(not self.ship[j] or j in inRun for j in target):
+                    moves.append(inRun.symmetric_difference(target))
+        else:
+            r, c = divmod(i, self.cols)
+            line = self.rowCells(r) if self.random.random() < 0.5 else self.colCells(c)
+            others = [j for j in line if self.hints[j] == '0' and self.ship[j] != self.ship[i]]
+            if others:
+                moves.append([i, self.random.choice(others)])
+
+        best, bestCost = None, None
+        for cells in moves:
+            if not cells:
+                continue
+            saved = self.flipAll(cells)
+            cost = self.cost()
+            self.unflipAll(saved)
+            if bestCost is None or cost < bestCost or (cost == bestCost and self.random.random() < 0.5):
+                best, bestCost = list(cells), cost
+        return best, bestCost
+
+    def randomStart(self):
+        '''
+        Builds a random complete grid respecting the hints: hinted cells keep their value, and the ships of the fleet,
+        longest first, are dropped at random on free cells, away from the segments already there when there's room.
+        A ship that doesn't fit anywhere is left out (the search will place it).
+        '''
+        self.ship = [symbol in ['M', '<', '>', '^', 'v', 'S'] for symbol in self.hints]
+        for length in range(len(self.ships), 0, -1):
+            for __ in range(self.ships[length - 1]):
+                apart, touching = [], []
+                for cells in self.placements[length]:
+                    if any(self.ship[j] for j in cells):
+                        continue
+                    if any(self.ship[k] for j in cells for k in self.around(j)):
+                        touching.append(cells)
+                    else:
+                        apart.append(cells)
+                spots = apart or touching
+                if spots:
+                    for j in self.random.choice(spots):
+                        self.ship[j] = True
+        self.rebuild()
+
+    def solve(self, max_steps=100000, tabu=5, restart_after=5000, max_restarts=None, noise=0.01, ship_moves=0.2, samples=5):
+        '''
+        Runs the local search. At each step, a random conflicted cell takes the value (ship or water) with the fewest
+        conflicts, ties broken at random. A flipped cell is tabu for the next "tabu" steps, unless flipping it beats
+        the best cost seen. With probability "noise", the cell is flipped whatever the cost (random walk).
+        With probability ship_moves, the step moves a whole ship instead (see shipMove, trying "samples" random positions
+        on top of its translations), kept like a flip if it removes conflicts: once the line counts are right, a single flip
+        can only break them, so the fleet and the contacts would stay stuck.
+        Without improvement of the best cost for restart_after steps, the search restarts from a new random grid.
+        Returns the solution grid, or None if no grid without conflicts was found. The best grid found is kept in self.best.
+        '''
+        self.best, self.bestCost = None, None
+
+        self.randomStart()
+        tabuUntil = {}
+        lastImprovement = 0
+        cost = self.cost()
+        while True:
+            if self.bestCost is None or cost < self.bestCost:
+                self.best, self.bestCost = self.toGrid(), cost
+                lastImprovement = self.steps
+            if cost == 0:
+                return self.toGrid()
+            if self.steps >= max_steps:
+                return None
+
+            if self.steps - lastImprovement > restart_after:
+                if max_restarts is not None and self.restarts >= max_restarts:
+                    return None
+                self.restarts += 1
+                self.randomStart()
+                tabuUntil = {}
+                lastImprovement = self.steps
+                cost = self.cost()
+                continue
+
+            self.steps += 1
+            if self.conflicted:
+                i = self.random.choice(tuple(self.conflicted))
+            else:                                           # Only the fleet is wrong: any free cell can help
+                i = self.random.choice(self.free)
+
+            if self.random.random() < ship_moves:
+                cells, moved = self.shipMove(i, samples)
+                if cells is not None and (moved < cost or (moved == cost and self.random.random() < 0.5)):
+                    self.flipAll(cells)
+                    cost = moved
+                    for j in cells:
+                        tabuUntil[j] = self.steps + tabu
+                        self.updateConflicted(j)
+                continue
+
+            saved = self.flip(i)
+            flipped = self.cost()
+            walk = self.random.random() < noise
+            allowed = tabuUntil.get(i, -1) < self.steps or flipped < self.bestCost
+            if walk or (allowed and (flipped < cost or (flipped == cost and self.random.random() < 0.5))):
+                cost = flipped
+                tabuUntil[i] = self.steps + tabu
+                self.updateConflicted(i)
+            else:
+                self.unflip(i, saved)
+
+    def toGrid(self):
+        '''Current grid, with the symbols drawn by drawShips.'''
+        return drawShips([['M' if self.ship[r * self.cols + c] else '.' for c in range(self.cols)] for r in range(self.rows)])
@@ -0,0 +1,96 @@
+import random
+import sys
+from collections import OrderedDict
+from typing import List
+
+from CellStates import SYMBOLS, UNASSIGNED
+
+
+class ZobristBand:
+    '''
+    Zobrist hash of the part of a grid that can still matter to a search: the cells within 2 cells of an unassigned cell
+    (the "band"), with their state. Cells further away are assigned, and so are all the cells their constraints read:
+    their constraints can't change any more. Two grids differing only there have the same hash.\n
+    Registered as an observer of every variable, the hash follows each setState: a state change XORs the cell's keys,
+    and a cell getting (un)assigned moves the cells around it in or out of the band.
+    '''
+
+    def __init__(self, grid: List[List[any]], seed=0):
+        rows, cols = len(grid), len(grid[0])
+        rng = random.Random(seed)
+        self.variables = [var for line in grid for var in line]                 # Row-major cells
+        self.index = {var: i for i, var in enumerate(self.variables)}
+        self.keys = [[rng.getrandbits(64) for code in range(len(SYMBOLS))] for _ in self.variables]   # Key of each cell and state code
+
+        # Cells within 2 cells of each cell (5x5 square)
+        self.near = [[ny * cols + nx for ny in range(max(i // cols - 2, 0), min(i // cols + 3, rows))
+                      for nx in range(max(i % cols - 2, 0), min(i % cols + 3, cols))] for i in range(len(self.variables))]
+
+        self.unknownNear = [0] * len(self.variables)        # Unassigned cells within 2 cells of each cell
+        for i, var in enumerate(self.variables):
+            if var.code == UNASSIGNED:
+                for j in self.near[i]:
+                    self.unknownNear[j] += 1
+        self.band = set(i for i in range(len(self.variables)) if self.unknownNear[i])
+        self.hash = 0
+        for i in self.band:
+            self.hash ^= self.keys[i][self.variables[i].code]
+
+    def stateChanged(self, var, oldCode, newCode):
+        i = self.index[var]
+        if i in self.band:
+            self.hash ^= self.keys[i][oldCode] ^ self.keys[i][newCode]
+
+        if oldCode == UNASSIGNED and newCode != UNASSIGNED:  # One unassigned cell less around the near cells
+            for j in self.near[i]:
+                self.unknownNear[j] -= 1
+                if not self.unknownNear[j]:
+                    self.band.discard(j)
+                    self.hash ^= self.keys[j][newCode if j == i else self.variables[j].code]
+        elif newCode == UNASSIGNED and oldCode != UNASSIGNED:
+            for j in self.near[i]:
+                if not self.unknownNear[j]:
+                    self.band.add(j)
+                    self.hash ^= self.keys[j][newCode if j == i else self.variables[j].code]
+                self.unknownNear[j] += 1
+
+
+class NogoodTable:
+    '''
+    Bounded table of the keys of partial grids proven to have no solution, evicting the least recently used key when full.
+    Counts its lookups, hits, stores and evictions, see stats.
+    '''
+
+    def __init__(self, maxSize=100000):
+        self.maxSize = maxSize
+        self.table = OrderedDict()
+        self.lookups = 0
+        self.hits = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def contains(self, key):
+        '''True if key is a known nogood (it becomes the most recently used one).'''
+        self.lookups += 1
+        if key in self.table:
+            self.hits += 1
+            self.table.move_to_end(key)
+            return True
+        return False
+
+    def add(self, key):
+        self.stores += 1
+        self.table[key] = True
+        self.table.move_to_end(key)
+        if len(self.table) > self.maxSize:
+            self.table.popitem(last=False)
+            self.evictions += 1
+
+    def memoryBytes(self):
+        '''Approximate memory used by the table: the ordered dictionary and its keys.'''
+        return sys.getsizeof(self.table) + sum(sys.getsizeof(key) for key in self.table)
+
+    def stats(self):
+        return {"entries": len(self.table), "maxSize": self.maxSize, "lookups": self.lookups, "hits": self.hits,
+                "hitRate": self.hits / self.lookups if self.lookups else 0.0, "stores": self.stores,
+                "evictions": self.evictions, "memoryBytes": self.memoryBytes()}
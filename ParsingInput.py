@@ -1,13 +1,29 @@
+def parse_numbers(line):
+    '''
+    Reads a line of numbers. Whitespace separated numbers can have several digits ("10 2 3"),
+    otherwise each character is a number ("311212").
+    '''
+    if len(line.split()) > 1:
+        return list(map(int, line.split()))
+    return list(map(int, line))
+
+
+def parse_battleship_lines(lines):
+    '''Parses the lines of a puzzle (same format as the input files). Returns the row targets, column targets, ship counts and grid.'''
+    lines = [line.strip() for line in lines]        # Strip newline characters and whitespaces (security measure)
+    lines = [line for line in lines if line]        # Ignore blank lines
+
+    horizontal_numbers = parse_numbers(lines[1])    # Getting constraints
+    vertical_numbers = parse_numbers(lines[0])
+    ship_counts = parse_numbers(lines[2])           # Number of ships of length 1, 2, 3... (as many lengths as numbers)
+
+    grid = [line.split() if len(line.split()) > 1 else list(line) for line in lines[3:]]   # Parsing the grid, cells can be whitespace separated too
+
+    return horizontal_numbers, vertical_numbers, ship_counts, grid
+
+
 def parse_battleship_input(file_path):
     with open(file_path, 'r') as file:
         lines = file.readlines()                    # Reading the file at given filepat
-        
-    lines = [line.strip() for line in lines]        # Strip newline characters and whitespaces (security measure)
-
-    horizontal_numbers = list(map(int, lines[1]))   # Getting constraints
-    vertical_numbers = list(map(int, lines[0]))
-    ship_counts = list(map(int, lines[2]))
 
-    grid = [list(line) for line in lines[3:]]       # Parsing the grid
-    
-    return horizontal_numbers, vertical_numbers, ship_counts, grid
\ No newline at end of file
+    return parse_battleship_lines(lines)
@@ -0,0 +1,219 @@
+from typing import List
+
+from GridSystem import drawShips
+
+
+class Placement:
+    '''One possible position of a ship: top-left cell (row, col), orientation and the masks used by the search.'''
+
+    def __init__(self, row, col, length, horizontal, cols, stride):
+        self.row, self.col = row, col
+        self.length = length
+        self.horizontal = horizontal
+
+        if horizontal:
+            self.cells = [(row, col + i) for i in range(length)]
+        else:
+            self.cells = [(row + i, col) for i in range(length)]
+
+        # Symbol expected on each cell, as drawShips would draw it
+        if length == 1:
+            self.symbols = ['S']
+        elif horizontal:
+            self.symbols = ['<'] + ['M'] * (length - 2) + ['>']
+        else:
+            self.symbols = ['^'] + ['M'] * (length - 2) + ['v']
+
+        self.mask = 0                   # Cells of the ship
+        self.halo = 0                   # Cells of the ship and around it, where no other ship can go
+        for r, c in self.cells:
+            self.mask |= 1 << (r * stride + c)
+            for y in range(r - 1, r + 2):
+                for x in range(c - 1, c + 2):
+                    if 0 <= y and 0 <= x < cols:
+                        self.halo |= 1 << (y * stride + x)
+
+        # Ship segments added to each row and column
+        self.rowUse = {}
+        self.colUse = {}
+        for r, c in self.cells:
+            self.rowUse[r] = self.rowUse.get(r, 0) + 1
+            self.colUse[c] = self.colUse.get(c, 0) + 1
+
+
+class PlacementSolver:
+    '''
+    Solves a puzzle by placing whole ships instead of assigning one symbol per cell.\n
+    For each ship length, every placement fitting the hints and the row/column targets is computed once.
+    The search places the longest ships first and prunes with the remaining row/column counts. Cells are bits of integer masks (row * stride + col, see BitBoard.py).
+    '''
+
+    def __init__(self, grid: List[List[str]], rowTargets: List[int], colTargets: List[int], ships: List[int]):
+        self.rows, self.cols = len(grid), len(grid[0])
+        self.stride = self.cols + 1
+        self.grid = [list(line) for line in grid]
+        self.rowTargets = list(rowTargets)
+        self.colTargets = list(colTargets)
+        self.ships = list(ships)
+        self.steps = 0
+
+        # Ship lengths to place, longest first
+        self.lengths = [length for length in range(len(ships), 0, -1) for _ in range(ships[length - 1])]
+
+        self.rowMasks = [sum(1 << (r * self.stride + c) for c in range(self.cols)) for r in range(self.rows)]
+        self.colMasks = [sum(1 << (r * self.stride + c) for r in range(self.rows)) for c in range(self.cols)]
+
+        # Hinted ship segments must all end up covered
+        self.hintShips = 0
+        for r, line in enumerate(self.grid):
+            for c, symbol in enumerate(line):
+                if symbol not in ['0', '.']:
+                    self.hintShips |= 1 << (r * self.stride + c)
+
+        # Placement tables: per length, every fitting placement
+        self.placements = {}
+        for length in set(self.lengths):
+            self.placements[length] = []
+            for horizontal in ([True, False] if length > 1 else [True]):
+                for r in range(self.rows):
+                    for c in range(self.cols):
+                        placement = Placement(r, c, length, horizontal, self.cols, self.stride)
+                        if self.fits(placement):
+                            self.placements[length].append(placement)
+
+
+    def fits(self, placement):
+        '''Checks a placement against the board bounds, the hints and the row/column targets.'''
+        for (r, c), symbol in zip(placement.cells, placement.symbols):
+            if r >= self.rows or c >= self.cols:
+                return False
+            if self.grid[r][c] not in ['0', symbol]:                # The ship can only cover unknown cells or matching hints
+                return False
+
+        for r in range(max(placement.row - 1, 0), min(placement.row + placement.length + 1, self.rows)):
+            for c in range(max(placement.col - 1, 0), min(placement.col + placement.length + 1, self.cols)):
+                if (r, c) not in placement.cells and placement.halo >> (r * self.stride + c) & 1:
+                    if self.grid[r][c] not in ['0', '.']:           # No hinted ship segment around it
+                        return False
+
+        return (all(count <= self.rowTargets[r] for r, count in placement.rowUse.items())
+                and all(count <= self.colTargets[c] for c, count in placement.colUse.items()))
+
+
+    def solve(self):
+        '''Returns the solution grid (list of rows of symbols) or None.'''
+        for solution in self.iterSolutions():
+            return solution
+        return None
+
+
+    def countSolutions(self, limit=None):
+        '''Counts the solutions, stopping as soon as limit solutions are found (all of them if limit is None).'''
+        count = 0
+        for __ in self.iterSolutions():
+            count += 1
+            if count == limit:
+                break
+        return count
+
+
+    def addHint(self, row, col, symbol):
+        '''
+        Reveals cell (row, col) as symbol. Instead of rebuilding the solver, the placements contradicting the hint are
+        dropped from the tables: the ones covering the cell with another symbol, and for a ship segment, the ones
+        touching it. The result is the same as building a new solver with the hint in the grid.
+        '''
+        self.grid[row][col] = symbol
+        bit = 1 << (row * self.stride + col)
+        if symbol != '.':
+            self.hintShips |= bit
+
+        for length, table in self.placements.items():
+            kept = []
+            for placement in table:
+                if placement.mask & bit:
+                    if symbol != placement.symbols[placement.cells.index((row, col))]:
+                        continue
+                elif symbol != '.' and placement.halo & bit:
+                    continue
+                kept.append(placement)
+            if len(kept) < len(table):
+                self.placements[length] = kept
+
+
+    def iterSolutions(self):
+        '''Generates every solution grid, each one once (ships of the same length are placed in table order).'''
+        if sum(self.lengths) != sum(self.rowTargets) or sum(self.lengths) != sum(self.colTargets):
+            return
+        placed = []
+        for covered in self.search(0, 0, 0, 0, list(self.rowTargets), list(self.colTargets), placed):
+            yield self.toGrid(covered)
+
+
+    def search(self, depth, start, covered, blocked, rowLeft, colLeft, placed):
+        '''
+        Places self.lengths[depth], trying placements from index start in its table.
+        covered are the ship cells placed so far, blocked the cells no new ship can use.
+        Yields the covered mask of every complete solution.
+        '''
+        self.steps += 1
+
+        if depth == len(self.lengths):
+            if covered & self.hintShips == self.hintShips:
+                yield covered
+            return
+
+        length = self.lengths[depth]
+        table = self.placements[length]
+        for index in range(start, len(table)):
+            placement = table[index]
+            if placement.mask & blocked:
+                continue
+            if any(count > rowLeft[r] for r, count in placement.rowUse.items()):
+                continue
+            if any(count > colLeft[c] for c, count in placement.colUse.items()):
+                continue
+
+            for r, count in placement.rowUse.items():
+                rowLeft[r] -= count
+            for c, count in placement.colUse.items():
+                colLeft[c] -= count
+            newCovered = covered | placement.mask
+            newBlocked = blocked | placement.halo
+            for r, count in placement.rowUse.items():               # Full rows and columns can't take more ships
+                if rowLeft[r] == 0:
+                    newBlocked |= self.rowMasks[r]
+            for c, count in placement.colUse.items():
+                if colLeft[c] == 0:
+                    newBlocked |= self.colMasks[c]
+
+            if self.canComplete(newCovered, newBlocked, rowLeft, colLeft):
+                # The next ship of the same length only looks at the following placements
+                nextStart = index + 1 if depth + 1 < len(self.lengths) and self.lengths[depth + 1] == length else 0
+                placed.append(placement)
+                yield from self.search(depth + 1, nextStart, newCovered, newBlocked, rowLeft, colLeft, placed)
+                placed.pop()
+
+            for r, count in placement.rowUse.items():
+                rowLeft[r] += count
+            for c, count in placement.colUse.items():
+                colLeft[c] += count
+
+
+    def canComplete(self, covered, blocked, rowLeft, colLeft):
+        '''Count-based pruning: uncovered hints must still be reachable, and each line must have enough free cells left.'''
+        if self.hintShips & blocked & ~covered:
+            return False
+        for r in range(self.rows):
+            if rowLeft[r] and (self.rowMasks[r] & ~blocked).bit_count() < rowLeft[r]:
+                return False
+        for c in range(self.cols):
+            if colLeft[c] and (self.colMasks[c] & ~blocked).bit_count() < colLeft[c]:
+                return False
+        return True
+
+
+    def toGrid(self, covered):
+        '''Turns a mask of ship cells into a grid of symbols, with drawShips.'''
+        grid = [['M' if covered >> (r * self.stride + c) & 1 else '.' for c in range(self.cols)] for r in range(self.rows)]
+        return drawShips(grid)
@@ -0,0 +1,144 @@
+import argparse
+import os
+import random
+from typing import List
+
+from GridSystem import drawShips
+from PlacementSolver import PlacementSolver
+
+
+def defaultFleet(size):
+    '''
+    Number of ships of each length for a size*size board: the 6x6 fleet of the assignment ("3210") for small boards,
+    the classic 10x10 fleet (4 submarines, 3 destroyers, 2 cruisers, 1 battleship) scaled with the area for bigger ones,
+    with 5 long carriers from 15x15 on.
+    '''
+    if size < 8:
+        return [3, 2, 1, 0]
+    factor = (size / 10) ** 2
+    fleet = [round(4 * factor), round(3 * factor), round(2 * factor), max(1, round(factor))]
+    if size >= 15:
+        fleet.append(max(1, round(factor / 2)))
+    return fleet
+
+
+def placeFleet(rows, cols, fleet, rng, attempts=1000):
+    '''
+    Places the ships of the fleet (number of ships of each length) at random on an empty rows*cols board,
+    without any two ships touching, even diagonally. Returns the grid of symbols (drawShips style), or None if the fleet doesn't fit.
+    '''
+    lengths = [length for length in range(len(fleet), 0, -1) for _ in range(fleet[length - 1])]
+
+    for _ in range(attempts):
+        occupied = [[False] * cols for _ in range(rows)]
+        for length in lengths:
+            spots = []                                  # Every free placement of the ship
+            for horizontal in [True, False]:
+                for r in range(rows - (0 if horizontal else length - 1)):
+                    for c in range(cols - (length - 1 if horizontal else 0)):
+                        cells = [(r, c + i) if horizontal else (r + i, c) for i in range(length)]
+                        if all(not occupied[y][x] for cell in cells
+                               for y in range(max(cell[0] - 1, 0), min(cell[0] + 2, rows))
+                               for x in range(max(cell[1] - 1, 0), min(cell[1] + 2, cols))):
+                            spots.append(cells)
+            if not spots:
+                break                                   # Dead end: start over
+            for r, c in rng.choice(spots):
+                occupied[r][c] = True
+        else:
+            return drawShips([['M' if occupied[r][c] else '.' for c in range(cols)] for r in range(rows)])
+
+    return None
+
+
+def randomPuzzle(size, fleet=None, hints=0.0, seed=None):
+    '''
+    Builds a random size*size puzzle: a random fleet placement, its row/column targets, and a random share "hints" of its cells revealed.
+    Returns the puzzle as (horizontal, vertical, ships, grid), like parse_battleship_input, and the solution grid.
+    The puzzle can have several solutions.
+    '''
+    rng = random.Random(seed)
+    fleet = defaultFleet(size) if fleet is None else list(fleet)
+    solution = placeFleet(size, size, fleet, rng)
+    if solution is None:
+        raise ValueError("The fleet {} doesn't fit on a {}x{} board".format(fleet, size, size))
+
+    horizontal = [sum(1 for symbol in line if symbol != '.') for line in solution]
+    vertical = [sum(1 for line in solution if line[c] != '.') for c in range(size)]
+
+    cells = [(r, c) for r in range(size) for c in range(size)]
+    revealed = set(rng.sample(cells, round(hints * len(cells))))
+    grid = [[solution[r][c] if (r, c) in revealed else '0' for c in range(size)] for r in range(size)]
+
+    return (horizontal, vertical, fleet, grid), solution
+
+
+def uniquePuzzle(size, fleet=None, seed=None):
+    '''
+    Builds a random size*size puzzle with exactly one solution: a random fleet placement and its row/column targets,
+    then hints until the puzzle is unique. Each round counts the solutions (stopping at 2) and, while there are two,
+    reveals the true symbol of a random cell where they differ, which rules the second one out.\n
+    The placement tables of the solver are kept from one round to the next, only filtered by each new hint.
+    Returns the puzzle as (horizontal, vertical, ships, grid), like parse_battleship_input, and its solution grid.
+    '''
+    rng = random.Random(seed)
+    fleet = defaultFleet(size) if fleet is None else list(fleet)
+    solution = placeFleet(size, size, fleet, rng)
+    if solution is None:
+        raise ValueError("The fleet {} doesn't fit on a {}x{} board".format(fleet, size, size))
+
+    horizontal = [sum(1 for symbol in line if symbol != '.') for line in solution]
+    vertical = [sum(1 for line in solution if line[c] != '.') for c in range(size)]
+    grid = [['0'] * size for _ in range(size)]
+
+    solver = PlacementSolver(grid, horizontal, vertical, fleet)
+    while True:
+        solutions = []
+        for other in solver.iterSolutions():
+            solutions.append(other)
+            if len(solutions) == 2:
+                break
+        if len(solutions) < 2:                          # The true solution always remains: the puzzle is unique
+            break
+
+        different = [(r, c) for r in range(size) for c in range(size) if solutions[0][r][c] != solutions[1][r][c]]
+        r, c = rng.choice(different)
+        grid[r][c] = solution[r][c]
+        solver.addHint(r, c, solution[r][c])
+
+    return (horizontal, vertical, fleet, grid), solution
+
+
+def puzzleLines(puzzle) -> List[str]:
+    '''Lines of a puzzle in the input file format. Numbers are whitespace separated as soon as one of them has several digits.'''
+    horizontal, vertical, ships, grid = puzzle
+
+    def numbers(values):
+        if any(value > 9 for value in values):
+            return " ".join(str(value) for value in values)
+        return "".join(str(value) for value in values)
+
+    return [numbers(vertical), numbers(horizontal), numbers(ships)] + ["".join(line) for line in grid]
+
+
+def writePuzzle(puzzle, file_path):
+    '''Writes a puzzle in the input file format.'''
+    with open(file_path, 'w') as file:
+        file.write("\n".join(puzzleLines(puzzle)) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Writes random puzzles with exactly one solution, in the input file format")
+    parser.add_argument("--size", type=int, default=6)
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=None, help="seed of the first puzzle, the next ones use the following seeds")
+    parser.add_argument("--output", default="Inputs", help="directory of the puzzle files")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    first = args.seed if args.seed is not None else random.randrange(10 ** 9)
+    for seed in range(first, first + args.count):
+        puzzle, __ = uniquePuzzle(args.size, seed=seed)
+        path = os.path.join(args.output, "unique{0}x{0}_{1}.txt".format(args.size, seed))
+        writePuzzle(puzzle, path)
+        print(path)
@@ -0,0 +1,204 @@
+from typing import List
+
+from CellStates import SYMBOLS, WATER
+
+CELL_SYMBOLS = SYMBOLS[WATER:]          # Symbols a cell can take (see CellStates.py): water, then the ship segments
+
+
+class CNFEncoding:
+    '''
+    Compiles a puzzle into CNF (clauses are lists of non-zero integers, DIMACS style: v is true, -v is false).\n
+    Variables:
+        - one per cell and symbol, exactly one of them true per cell,
+        - one per middle segment, true if the ship is horizontal,
+        - one per possible ship (length and top-left cell, horizontal or vertical), true if that ship is on the grid,
+        - the auxiliary variables of the sequential counters.
+    Clauses:
+        - the shape rules of stateConstraint: the neighbours each symbol needs (out of the grid counts as water),
+        - the no-touch rule of surroundedByWater: two diagonal neighbours are never both ship segments,
+        - the hints,
+        - the row and column targets, and the number of ships of each length, as sequential counters.
+    '''
+
+    def __init__(self, grid: List[List[str]], rowTargets: List[int], colTargets: List[int], ships: List[int]):
+        self.rows, self.cols = len(grid), len(grid[0])
+        self.grid = [list(line) for line in grid]
+        self.rowTargets = list(rowTargets)
+        self.colTargets = list(colTargets)
+        self.ships = list(ships)
+        self.numVars = 0
+        self.clauses = []
+
+        self.cells = [[{symbol: self.newVar() for symbol in CELL_SYMBOLS} for c in range(self.cols)] for r in range(self.rows)]
+        self.horizontalMiddle = [[self.newVar() for c in range(self.cols)] for r in range(self.rows)]
+        self.encode()
+
+
+    def newVar(self):
+        self.numVars += 1
+        return self.numVars
+
+
+    def lit(self, r, c, symbol):
+        '''Literal of cell (r, c) holding symbol. Out of the grid, only water is possible: None means true, False means false.'''
+        if 0 <= r < self.rows and 0 <= c < self.cols:
+            return self.cells[r][c][symbol]
+        return None if symbol == '.' else False
+
+
+    def water(self, r, c):
+        return self.lit(r, c, '.')
+
+
+    def addClause(self, literals):
+        '''Adds a clause, dropping the false literals and the whole clause if a literal is always true (None).'''
+        clause = []
+        for literal in literals:
+            if literal is None:
+                return
+            if literal is not False:
+                clause.append(literal)
+        self.clauses.append(clause)
+
+
+    def implies(self, conditions, options):
+        '''Clause: all the conditions (literals) imply one of the options (literals, None/False for out of the grid).'''
+        self.addClause([-literal for literal in conditions] + list(options))
+
+
+    # ----- Cardinality -----
+
+    def exactly(self, literals, k):
+        '''
+        Sequential counter (Sinz), in both directions: exactly k of the literals are true.
+        s[i][j] is true if and only if at least j + 1 of the first i + 1 literals are true, for j up to k:
+        n * (k + 1) variables, so counting a few ships among many possible ones stays small.
+        '''
+        n = len(literals)
+        if k < 0 or k > n:
+            self.addClause([])                          # Impossible
+            return
+        if k == 0:
+            for literal in literals:
+                self.addClause([-literal])
+            return
+
+        width = min(k + 1, n)
+        s = [[self.newVar() for j in range(width)] for i in range(n)]
+        self.addClause([-literals[0], s[0][0]])
+        self.addClause([literals[0], -s[0][0]])
+        for j in range(1, width):
+            self.addClause([-s[0][j]])
+        for i in range(1, n):
+            x = literals[i]
+            for j in range(width):
+                self.addClause([-s[i - 1][j], s[i][j]])                 # Counts never decrease
+                self.addClause([-s[i][j], s[i - 1][j], x])              # A new count needs x...
+                if j == 0:
+                    self.addClause([-x, s[i][0]])
+                else:
+                    self.addClause([-x, -s[i - 1][j - 1], s[i][j]])
+                    self.addClause([-s[i][j], s[i - 1][j], s[i - 1][j - 1]])   # ...and the count below it
+
+        self.addClause([s[n - 1][k - 1]])               # At least k
+        if k < n:
+            self.addClause([-s[n - 1][k]])              # Not k + 1
+
+
+    # ----- Encoding -----
+
+    def encode(self):
+        rows, cols = self.rows, self.cols
+
+        for r in range(rows):
+            for c in range(cols):
+                cell = self.cells[r][c]
+                # Exactly one symbol per cell
+                self.addClause(list(cell.values()))
+                for i, first in enumerate(CELL_SYMBOLS):
+                    for second in CELL_SYMBOLS[i + 1:]:
+                        self.addClause([-cell[first], -cell[second]])
+
+                # Hints
+                if self.grid[r][c] in CELL_SYMBOLS:
+                    self.addClause([cell[self.grid[r][c]]])
+
+                # Shape rules
+                up, down, left, right = (r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)
+                for symbol, waters, (nextCell, nextSymbols) in [
+                        ('<', [left, up, down], (right, ['M', '>'])),
+                        ('>', [right, up, down], (left, ['M', '<'])),
+                        ('^', [up, left, right], (down, ['M', 'v'])),
+                        ('v', [down, left, right], (up, ['M', '^']))]:
+                    for position in waters:
+                        self.implies([cell[symbol]], [self.water(*position)])
+                    self.implies([cell[symbol]], [self.lit(*nextCell, option) for option in nextSymbols])
+                for position in [up, down, left, right]:
+                    self.implies([cell['S']], [self.water(*position)])
+
+                horizontal = self.horizontalMiddle[r][c]
+                self.implies([cell['M'], horizontal], [self.lit(*left, option) for option in ['<', 'M']])
+                self.implies([cell['M'], horizontal], [self.lit(*right, option) for option in ['M', '>']])
+                self.implies([cell['M'], horizontal], [self.water(*up)])
+                self.implies([cell['M'], horizontal], [self.water(*down)])
+                self.implies([cell['M'], -horizontal], [self.lit(*up, option) for option in ['^', 'M']])
+                self.implies([cell['M'], -horizontal], [self.lit(*down, option) for option in ['M', 'v']])
+                self.implies([cell['M'], -horizontal], [self.water(*left)])
+                self.implies([cell['M'], -horizontal], [self.water(*right)])
+
+                # No-touch: diagonal neighbours
+                for dr, dc in [(1, -1), (1, 1)]:
+                    if 0 <= r + dr < rows and 0 <= c + dc < cols:
+                        self.addClause([cell['.'], self.cells[r + dr][c + dc]['.']])
+
+        # Row and column targets
+        for r in range(rows):
+            self.exactly([-self.cells[r][c]['.'] for c in range(cols)], self.rowTargets[r])
+        for c in range(cols):
+            self.exactly([-self.cells[r][c]['.'] for r in range(rows)], self.colTargets[c])
+
+        # Fleet: one variable per possible ship, equivalent to its symbols
+        shipsOfLength = {length: [] for length in range(1, len(self.ships) + 1)}
+        starts = {}                                     # (r, c, start symbol) -> ships starting there
+        for r in range(rows):
+            for c in range(cols):
+                shipsOfLength[1].append(self.cells[r][c]['S'])
+                for length in range(2, len(self.ships) + 1):
+                    for (dr, dc), (start, end) in [((0, 1), ('<', '>')), ((1, 0), ('^', 'v'))]:
+                        if r + dr * (length - 1) >= rows or c + dc * (length - 1) >= cols:
+                            continue
+                        symbols = [start] + ['M'] * (length - 2) + [end]
+                        literals = [self.cells[r + dr * i][c + dc * i][symbol] for i, symbol in enumerate(symbols)]
+                        ship = self.newVar()
+                        for literal in literals:
+                            self.addClause([-ship, literal])
+                        self.addClause([ship] + [-literal for literal in literals])
+                        shipsOfLength[length].append(ship)
+                        starts.setdefault((r, c, start), []).append(ship)
+
+        # Every ship start begins a ship of the fleet's lengths (no longer ship)
+        for r in range(rows):
+            for c in range(cols):
+                for start in ['<', '^']:
+                    self.addClause([-self.cells[r][c][start]] + starts.get((r, c, start), []))
+
+        for length, count in enumerate(self.ships, start=1):
+            self.exactly(shipsOfLength[length], count)
+
+
+    def preferredPhases(self):
+        '''Literals a solver should try first: water, as most cells are water.'''
+        return [self.cells[r][c]['.'] for r in range(self.rows) for c in range(self.cols)]
+
+
+    def decode(self, model):
+        '''Grid of symbols of a model (model[v] true or false for each variable v).'''
+        return [[next(symbol for symbol in CELL_SYMBOLS if model[self.cells[r][c][symbol]]) for c in range(self.cols)] for r in range(self.rows)]
+
+
+    def writeDIMACS(self, file_path):
+        '''Writes the CNF in the DIMACS format.'''
+        with open(file_path, 'w') as file:
+            file.write("p cnf {} {}\n".format(self.numVars, len(self.clauses)))
+            for clause in self.clauses:
+                file.write(" ".join(str(literal) for literal in clause) + " 0\n")
@@ -0,0 +1,362 @@
+# Local solving service: puzzles in, solutions and steps out, over HTTP on a TCP port or on a Unix socket.
+# Run with: python SolverService.py --port 8765 --workers 4
+#           python SolverService.py --unix /tmp/battleship.sock
+# Then:     curl --data-binary @Inputs/testInput.txt "localhost:8765/solve?method=mac&timeout=10"
+#           curl -d '{"puzzle": {"horizontal": [...], "vertical": [...], "ships": [...], "grid": [...]}, "method": "placement"}' localhost:8765/solve
+#           curl localhost:8765/stats
+# /solve answers {"status", "solution", "steps", "time", "hash", "cached"}, status being "solved", "unsolved", "timeout" or "error".
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import time
+import urllib.parse
+from collections import OrderedDict
+
+from CSPRequirements import *
+
+# Methods of BattleShipProblem.solve the service runs ("parallel" needs its own pool, which a worker process can't have)
+SERVICE_METHODS = ["backtracking", "backtracking_iterative", "backtracking_forwardchecking", "backtracking_forwardchecking_iterative",
+                   "mac", "bitboard", "placement", "patterns", "min_conflicts", "sat"]
+
+# Options of BattleShipProblem.solve a client may pass, per method, with their type. Only search parameters:
+# options writing files (sat's dimacs) or reading anything from the server are never accepted.
+SERVICE_OPTIONS = {
+    "backtracking_forwardchecking": {"nogoods": int},
+    "min_conflicts": {"max_steps": int, "tabu": int, "restart_after": int, "max_restarts": int, "noise": float,
+                      "ship_moves": float, "seed": int, "approximate": bool},
+    "sat": {"max_conflicts": int},
+}
+
+HTTP_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error", 504: "Gateway Timeout"}
+
+
+def parsePuzzle(puzzle):
+    '''
+    Reads a puzzle given as text (Inputs/ file format) or as a dictionary {"horizontal", "vertical", "ships", "grid"},
+    grid rows being strings or lists of symbols. Returns (horizontal, vertical, ships, grid), grid rows being lists.
+    Raises ValueError if the puzzle is malformed.
+    '''
+    try:
+        if isinstance(puzzle, str):
+            horizontal, vertical, ships, grid = parse_battleship_lines(puzzle.splitlines())
+        else:
+            horizontal, vertical, ships = (list(map(int, puzzle[key])) for key in ["horizontal", "vertical", "ships"])
+            grid = [list(line) for line in puzzle["grid"]]
+    except (KeyError, IndexError, TypeError, ValueError) as error:
+        raise ValueError("Malformed puzzle ({}: {})".format(type(error).__name__, error))
+
+    if len(grid) != len(horizontal) or not grid or any(len(line) != len(vertical) for line in grid):
+        raise ValueError("The grid doesn't match the {} row and {} column targets".format(len(horizontal), len(vertical)))
+    return horizontal, vertical, ships, grid
+
+
+def checkOptions(method, options):
+    '''Checks the options of a job against SERVICE_OPTIONS. Returns them, or raises ValueError for an unknown key or a bad value.'''
+    if not isinstance(options, dict):
+        raise ValueError("options must be a JSON object")
+    allowed = SERVICE_OPTIONS.get(method, {})
+    for name, value in options.items():
+        if name not in allowed:
+            raise ValueError("Unknown option {} for {}, expected one of: {}".format(name, method, ", ".join(allowed) or "none"))
+        kind = allowed[name]
+        if isinstance(value, bool):                             # JSON true/false: only for bool options
+            fits = kind is bool
+        else:
+            fits = value is None or isinstance(value, (int, float) if kind is float else kind)
+        if not fits:
+            raise ValueError("Option {} must be {}".format(name, kind.__name__))
+    return options
+
+
+def puzzleHash(puzzle, method, heuristic, options):
+    '''Cache key of a job: hash of the puzzle and of the way it's solved (the steps depend on it).'''
+    canonical = json.dumps([puzzle, method, heuristic, sorted(options.items())], separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def solvePuzzle(puzzle, method, heuristic, options):
+    '''Solves a parsed puzzle. Returns its record {"status", "solution", "steps", "time"}, like BatchSolver.solvePuzzleFile.'''
+    record = {"status": "error", "solution": None, "steps": None, "time": None}
+    start = time.perf_counter()
+    try:
+        bsp = BattleShipProblem("Service", puzzle=puzzle)
+        solution = bsp.solve(method, heuristic, **options)
+    except Exception as error:
+        record["error"] = "{}: {}".format(type(error).__name__, error)
+        return record
+    record["time"] = time.perf_counter() - start
+    record["steps"] = bsp.steps
+
+    if solution:
+        record["status"] = "solved"
+        record["solution"] = ["".join(line) for line in solutionGridBuilder(solution, len(bsp.gridVarRow), len(bsp.gridVarCol))]
+    else:
+        record["status"] = "unsolved"
+    return record
+
+
+def workerLoop(conn):
+    '''Main loop of a worker process: receives (puzzle, method, heuristic, options) jobs and sends back their records.'''
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:                                        # The service is gone
+            return
+        conn.send(solvePuzzle(*job))
+
+
+class SolverWorker:
+    '''
+    A worker process of the service, solving one job at a time. A job going past its deadline is cancelled by
+    terminating the process, which is replaced by a fresh one: the search can't be interrupted from the outside otherwise.
+    '''
+
+    def __init__(self):
+        self.process = None
+        self.conn = None
+        self.start()
+
+    def start(self):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=workerLoop, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def restart(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+        self.start()
+
+    async def run(self, job, timeout):
+        '''Runs job in the process. Returns its record, or raises asyncio.TimeoutError after timeout seconds (the job is cancelled).'''
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        fd = self.conn.fileno()
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            self.conn.send(job)
+            await asyncio.wait_for(ready, timeout)
+            return self.conn.recv()
+        except asyncio.TimeoutError:
+            self.restart()
+            raise
+        except (EOFError, OSError) as error:                    # The process died
+            self.restart()
+            return {"status": "error", "solution": None, "steps": None, "time": None,
+                    "error": "Worker process failed ({})".format(type(error).__name__)}
+        finally:
+            loop.remove_reader(fd)
+
+    def close(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+class SolverService:
+    '''
+    Queues the puzzles submitted to worker processes (os.cpu_count() by default), each job having a deadline
+    (its timeout counts from the submission, time in the queue included).\n
+    Finished results ("solved" and "unsolved") are cached by puzzle hash (see puzzleHash), the least recently used one
+    being evicted past cacheSize. A puzzle submitted while the same one is queued or running waits for that job
+    instead of being solved again. Timeouts and errors aren't cached: the puzzle is solved again next time.
+    '''
+
+    def __init__(self, workers=None, cacheSize=1024, timeout=30.0, method="mac", heuristic=None):
+        self.workerCount = workers or multiprocessing.cpu_count()
+        self.cacheSize = cacheSize
+        self.timeout = timeout                                  # Default job timeout, in seconds
+        self.method = method                                    # Default solving method and heuristic
+        self.heuristic = heuristic
+        self.cache = OrderedDict()                              # Puzzle hash -> record
+        self.pending = {}                                       # Puzzle hash -> future of the job queued or running
+        self.queue = None
+        self.workers = []
+        self.tasks = []
+        self.running = 0
+        self.counts = {"submitted": 0, "cacheHits": 0, "joined": 0}     # Joined: waited for an identical job
+        self.statuses = {}                                      # Status -> number of jobs run
+
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.workers = [SolverWorker() for _ in range(self.workerCount)]
+        self.tasks = [asyncio.create_task(self.serveQueue(worker)) for worker in self.workers]
+
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        for worker in self.workers:
+            worker.close()
+
+
+    async def serveQueue(self, worker):
+        '''Takes the queued jobs one at a time and runs them in worker.'''
+        while True:
+            key, job, deadline = await self.queue.get()
+            self.running += 1
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                record = await worker.run(job, remaining)
+            except asyncio.TimeoutError:
+                record = {"status": "timeout", "solution": None, "steps": None, "time": None}
+            except Exception as error:                          # Keep serving the queue, the waiting clients get the error
+                record = {"status": "error", "solution": None, "steps": None, "time": None,
+                          "error": "{}: {}".format(type(error).__name__, error)}
+            finally:
+                self.running -= 1
+                self.queue.task_done()
+
+            self.statuses[record["status"]] = self.statuses.get(record["status"], 0) + 1
+            if record["status"] in ["solved", "unsolved"]:
+                self.cache[key] = record
+                if len(self.cache) > self.cacheSize:
+                    self.cache.popitem(last=False)
+            self.pending.pop(key).set_result(record)
+
+
+    async def submit(self, puzzle, method=None, heuristic=None, timeout=None, options=None):
+        '''
+        Solves a parsed puzzle (see parsePuzzle) through the queue, or takes its result from the cache.
+        Returns the record (see solvePuzzle) with its "hash" and "cached" (True if it didn't run a new job).
+        '''
+        method = method or self.method
+        heuristic = heuristic if heuristic is not None else self.heuristic
+        if method not in SERVICE_METHODS:
+            raise ValueError("Unknown method {}, expected one of {}".format(method, ", ".join(SERVICE_METHODS)))
+        options = checkOptions(method, options if options is not None else {})
+        self.counts["submitted"] += 1
+
+        key = puzzleHash(puzzle, method, heuristic, options)
+        cached = True
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.counts["cacheHits"] += 1
+            record = self.cache[key]
+        elif key in self.pending:
+            self.counts["joined"] += 1
+            record = await asyncio.shield(self.pending[key])
+        else:
+            cached = False
+            self.pending[key] = asyncio.get_running_loop().create_future()
+            deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+            await self.queue.put((key, (puzzle, method, heuristic, options), deadline))
+            record = await asyncio.shield(self.pending[key])    # A client going away doesn't cancel the job of the others
+
+        return dict(record, hash=key, cached=cached)
+
+
+    def stats(self):
+        return {"workers": self.workerCount, "queued": self.queue.qsize() if self.queue else 0, "running": self.running,
+                "pending": len(self.pending), "cacheEntries": len(self.cache), "cacheSize": self.cacheSize,
+                "counts": dict(self.counts), "statuses": dict(self.statuses)}
+
+
+    # ----- HTTP -----
+
+    async def handle(self, reader, writer):
+        '''Serves one HTTP request (the connection is closed after the response).'''
+        try:
+            requestLine = (await reader.readline()).decode("latin-1")
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1")
+                if line in ["\r\n", "\n", ""]:
+                    break
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            verb, target = requestLine.split()[:2]
+            status, payload = await self.route(verb, target, headers, body)
+        except ValueError as error:
+            status, payload = 400, {"error": str(error)}
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except Exception as error:
+            status, payload = 500, {"error": "{}: {}".format(type(error).__name__, error)}
+
+        data = json.dumps(payload).encode()
+        writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: close\r\n\r\n"
+                     .format(status, HTTP_STATUS[status], len(data)).encode() + data)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+    async def route(self, verb, target, headers, body):
+        '''
+        Returns (HTTP status, JSON payload) of a request.\n
+        POST /solve: the body is a puzzle file (method, heuristic and timeout in the query string), or a JSON object
+        {"puzzle": puzzle file text or {"horizontal", "vertical", "ships", "grid"}, "method", "heuristic", "timeout", "options"},
+        options being limited to the search parameters of SERVICE_OPTIONS.
+        GET /stats: the queue, cache and job counts.
+        '''
+        url = urllib.parse.urlsplit(target)
+        if url.path == "/stats":
+            return (200, self.stats()) if verb == "GET" else (405, {"error": "Use GET"})
+        if url.path != "/solve":
+            return 404, {"error": "Unknown path {}".format(url.path)}
+        if verb != "POST":
+            return 405, {"error": "Use POST"}
+
+        query = dict(urllib.parse.parse_qsl(url.query))
+        text = body.decode("utf-8")
+        if "json" in headers.get("content-type", "") or text.lstrip().startswith("{"):
+            try:
+                request = json.loads(text)
+            except json.JSONDecodeError as error:
+                raise ValueError("Malformed JSON ({})".format(error))
+            if not isinstance(request, dict) or "puzzle" not in request:
+                raise ValueError("Expected a JSON object with a puzzle")
+        else:
+            request = dict(query, puzzle=text)
+
+        timeout = request.get("timeout")
+        record = await self.submit(parsePuzzle(request["puzzle"]), request.get("method"), request.get("heuristic"),
+                                   float(timeout) if timeout is not None else None, request.get("options"))
+        return (504 if record["status"] == "timeout" else 200), record
+
+
+async def serve(service, host="127.0.0.1", port=8765, unix=None):
+    '''Runs service until cancelled, on host:port or on the Unix socket path unix.'''
+    await service.start()
+    if unix:
+        server = await asyncio.start_unix_server(service.handle, path=unix)
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+    print("Serving on", unix or "http://{}:{}".format(host, port), flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Battleship solving service (HTTP over TCP or a Unix socket).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="serve on this Unix socket path instead of host:port")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--cache-size", type=int, default=1024, help="results kept in the cache")
+    parser.add_argument("--timeout", type=float, default=30.0, help="default job timeout in seconds")
+    parser.add_argument("--method", default="mac", choices=SERVICE_METHODS, help="default solving method")
+    parser.add_argument("--heuristic", default=None, help="default heuristic: LCV, MRV or MRV+LCV")
+    args = parser.parse_args()
+
+    service = SolverService(args.workers, args.cache_size, args.timeout, args.method, args.heuristic)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
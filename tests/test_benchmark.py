@@ -0,0 +1,25 @@
+from Benchmark import summarize, timedSolve
+from PuzzleGenerator import randomPuzzle
+
+
+def run(method, checks, peak, status="solved"):
+    return dict(method=method, heuristic=None, size=6, difficulty="easy", status=status,
+                time=1.0, steps=10, revisions=0, checks=checks, peak=peak)
+
+
+def test_summarize_skips_missing_measures():
+    '''The medians only count the runs where the measure was taken, and are None when it never was.'''
+    summary = summarize([run("mac", None, None), run("mac", 4, 100), run("mac", 6, 300),
+                         run("mac", None, None, status="timeout"), run("sat", None, None)])
+    assert summary["mac 6x6 easy"]["checks"] == 5
+    assert summary["mac 6x6 easy"]["peak"] == 200
+    assert summary["mac 6x6 easy"]["timeouts"] == 1
+    assert summary["sat 6x6 easy"]["checks"] is None
+    assert summary["sat 6x6 easy"]["peak"] is None
+
+
+def test_checks_of_methods_without_constraint_checks():
+    '''Engines that never call Constraint.check report no checks (None), not 0.'''
+    puzzle = randomPuzzle(6, hints=0.3, seed=0)[0]
+    assert timedSolve("sat", None, puzzle, 20.0, measureMemory=False)["checks"] is None
+    assert timedSolve("mac", None, puzzle, 20.0, measureMemory=False)["checks"] > 0
@@ -0,0 +1,31 @@
+import os
+
+from CSPRequirements import BattleShipProblem
+
+TEST_INPUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Inputs", "testInput.txt")
+
+
+def test_lcv_scores_the_constraints_of_the_neighbours():
+    '''The cell right of a "<" hint: water breaks the shape of the hint, so LCV doesn't try it first.'''
+    grid = [['<', '0', '0', '0'],
+            ['0', '0', '0', '0'],
+            ['0', '0', '0', '0'],
+            ['0', '0', '0', '0']]
+    problem = BattleShipProblem("lcv", puzzle=([2, 0, 0, 0], [1, 1, 0, 0], [0, 1], grid))
+    var = problem.gridVarRow[0][1]
+
+    assert var.domain[0] == '.'
+    ordered = problem.least_constraining_values(var, True)
+    assert ordered != var.domain
+    assert ordered.index('.') > ordered.index('>')
+    assert ordered.index('.') > ordered.index('M')
+
+
+def test_lcv_changes_the_search():
+    '''On the test input, forward checking with LCV doesn't take the same path as without it.'''
+    steps = {}
+    for heuristic in [None, "LCV"]:
+        problem = BattleShipProblem("lcv", TEST_INPUT)
+        assert problem.solve("backtracking_forwardchecking", heuristic) is not None
+        steps[heuristic] = problem.steps
+    assert steps[None] != steps["LCV"]
@@ -0,0 +1,21 @@
+from CSPRequirements import BattleShipProblem, solutionGridBuilder
+from PuzzleGenerator import randomPuzzle
+
+
+def test_min_conflicts_solves_a_10x10_puzzle():
+    '''With the default budget, min-conflicts solves generated 10x10 puzzles without hints (ship moves needed).'''
+    solved = 0
+    for seed in range(3):
+        puzzle = randomPuzzle(10, seed=seed)[0]
+        horizontal, vertical, ships, __ = puzzle
+        problem = BattleShipProblem("min_conflicts", puzzle=puzzle)
+        solution = problem.solve("min_conflicts", None, seed=0)
+        if solution is None:
+            continue
+
+        grid = solutionGridBuilder(solution)
+        assert problem.conflicts == 0
+        assert [sum(symbol != '.' for symbol in line) for line in grid] == horizontal
+        assert [sum(line[c] != '.' for line in grid) for c in range(10)] == vertical
+        solved += 1
+    assert solved >= 1